@@ -1,7 +1,6 @@
 import os
-import requests
 import anthropic
-from typing import Optional
+from typing import Any, Dict, List, Optional
 from dotenv import load_dotenv
 
 class AnthropicAgent:
@@ -13,37 +12,110 @@ class AnthropicAgent:
             api_key (str): Your Anthropic API key
         """
         self.api_key = api_key
+        self.model = "claude-3-5-sonnet-20241022"
+        self.max_tokens = 4096
         self.client = anthropic.Anthropic(
             api_key=api_key
         )
+        self._async_client = None
     
-    def run(self, prompt: str, image_path: Optional[str] = None) -> str:
+    @property
+    def async_client(self) -> anthropic.AsyncAnthropic:
+        """Async client, built on first use so it belongs to the running event loop"""
+        if self._async_client is None:
+            self._async_client = anthropic.AsyncAnthropic(api_key=self.api_key)
+        return self._async_client
+    
+    def _request(self, prompt: str, system: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Build the Messages API arguments for a prompt.
+        
+        Each stable system block is marked with a prompt-cache breakpoint so
+        repeated instructions and structures are read from Anthropic's cache.
+        The API allows four breakpoints per request, so only the last four
+        blocks (the longest prefixes) are marked.
+        """
+        request = {
+            "model": self.model,
+            "max_tokens": self.max_tokens,
+            "messages": [
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ]
+        }
+        if system:
+            blocks = [{"type": "text", "text": text} for text in system]
+            for block in blocks[-4:]:
+                block["cache_control"] = {"type": "ephemeral"}
+            request["system"] = blocks
+        return request
+    
+    def run(self, prompt: str, image_path: Optional[str] = None, system: Optional[List[str]] = None,
+            timeout: Optional[float] = None) -> str:
         """
         Send a prompt to Claude and get the response.
         
         Args:
             prompt (str): The message to send to Claude
             image_path (str, optional): Path to an image file (for future use)
+            system (List[str], optional): Stable prompt blocks to send as a cached system prompt
+            timeout (float, optional): Seconds before the request is abandoned
             
         Returns:
-            str: Claude's response text or error message
+            str: Claude's response text
+            
+        Raises:
+            anthropic.APIError: If the request failed (APIStatusError carries the HTTP status)
+        """
+        response = self.client.messages.create(**self._request(prompt, system), timeout=timeout)
+        return response.content[0].text
+
+    async def arun(self, prompt: str, image_path: Optional[str] = None, system: Optional[List[str]] = None,
+                   timeout: Optional[float] = None) -> str:
+        """
+        Send a prompt to Claude on the async client and get the response.
+        
+        Takes the same arguments, returns the same values and raises the same errors as run().
+        """
+        response = await self.async_client.messages.create(**self._request(prompt, system), timeout=timeout)
+        return response.content[0].text
+
+    async def aclose(self):
+        """Close the async client's connections"""
+        if self._async_client is not None:
+            await self._async_client.close()
+            self._async_client = None
+
+    def stream(self, prompt: str, image_path: Optional[str] = None, system: Optional[List[str]] = None,
+               timeout: Optional[float] = None):
+        """
+        Send a prompt to Claude and yield the response text as it arrives.
+        
+        Args:
+            prompt (str): The message to send to Claude
+            image_path (str, optional): Path to an image file (for future use)
+            system (List[str], optional): Stable prompt blocks to send as a cached system prompt
+            timeout (float, optional): Seconds before the request is abandoned
+            
+        Yields:
+            str: Chunks of Claude's response text
+        """
+        with self.client.messages.stream(**self._request(prompt, system), timeout=timeout) as stream:
+            for text in stream.text_stream:
+                yield text
+
+    async def astream(self, prompt: str, image_path: Optional[str] = None, system: Optional[List[str]] = None,
+                      timeout: Optional[float] = None):
+        """
+        Send a prompt to Claude on the async client and yield the response text as it arrives.
+        
+        Takes the same arguments and yields the same chunks as stream().
         """
-        try:
-            response = self.client.messages.create(
-                model="claude-3-5-sonnet-20241022",
-                max_tokens=4096,
-                messages=[
-                    {
-                        "role": "user", 
-                        "content": prompt
-                    }
-                ]
-            )
-            return response.content[0].text
-        except requests.exceptions.RequestException as e:
-            return f"Network Error: {str(e)}"
-        except Exception as e:
-            return f"Unexpected Error: {str(e)}"
+        async with self.async_client.messages.stream(**self._request(prompt, system), timeout=timeout) as stream:
+            async for text in stream.text_stream:
+                yield text
 
 def main():
     """Example usage of the AnthropicAgent class"""
@@ -1,5 +1,18 @@
+import os
+
+from services.deadline import current_timeout
+from services.executor import run_blocking
+
+from .resilience import ProviderError, ProviderUnavailable, error_status, get_provider_guard
+from .streaming import TokenStream
+
+# Prefixes that agents which do not raise put on error results
+ERROR_PREFIXES = ("Error:", "Unexpected Error:", "Network Error:")
+
 class AgentWrapper:
     def __init__(self, framework, api_key=None):
+        # Upper bound on one provider call; shortened to the request deadline when there is one
+        self.timeout = float(os.getenv("LLM_TIMEOUT", "300"))
         if framework == "openai":
             from .openai import OpenAIAgent
             self.agent = OpenAIAgent(api_key)
@@ -15,14 +28,129 @@ class AgentWrapper:
             self.agent = DeepSeekAgent(api_key)
         else:
             raise ValueError("Unsupported framework")
+        self.framework = framework
+        self.frameworks = [framework]
+        # Circuit breaker and concurrency limiter shared by every agent on this provider
+        self.guard = get_provider_guard(framework)
+
+    def run(self, prompt, image_path=None, system=None):
+        """Run a prompt to completion.
+
+        `system` is an optional list of stable prompt blocks (instructions,
+        structure) sent ahead of the prompt as a cacheable system prompt.
+        Failures raise ProviderError ("LLM execution failed: ...") with the
+        provider's HTTP status when it sent one; a call refused by the
+        provider guard raises ProviderUnavailable.
+        """
+        timeout = current_timeout(self.timeout)
+        try:
+            with self.guard.slot(deadline_bound=timeout < self.timeout):
+                result = self.agent.run(prompt, image_path, system=system, timeout=timeout)
+                return self._checked(result)
+        except (ProviderUnavailable, ProviderError):
+            raise
+        except Exception as e:
+            raise self._failed(e) from e
+
+    async def arun(self, prompt, image_path=None, system=None):
+        """Run a prompt to completion on the provider's async client.
+
+        Awaiting the call holds no thread, so one worker can keep many
+        generations in flight. Providers without an async client run on
+        the blocking pool instead. Failures are raised the same way as in run().
+        """
+        if not hasattr(self.agent, "arun"):
+            return await run_blocking("llm", self.run, prompt, image_path, system)
+
+        timeout = current_timeout(self.timeout)
+        try:
+            async with self.guard.aslot(deadline_bound=timeout < self.timeout):
+                result = await self.agent.arun(prompt, image_path, system=system, timeout=timeout)
+                return self._checked(result)
+        except (ProviderUnavailable, ProviderError):
+            raise
+        except Exception as e:
+            raise self._failed(e) from e
+
+    async def arun_served(self, prompt, image_path=None, system=None):
+        """arun(), also returning the wrapper whose provider served the call (this one)"""
+        return self, await self.arun(prompt, image_path, system)
+
+    async def aclose(self):
+        """Close the provider's async connections"""
+        if hasattr(self.agent, "aclose"):
+            await self.agent.aclose()
 
-    def run(self, prompt, image_path=None):
-        result = self.agent.run(prompt, image_path)
-        
+    def _error(self, result):
+        # The provider's error message if the result is an error string, else None
+        if isinstance(result, str):
+            for prefix in ERROR_PREFIXES:
+                if result.startswith(prefix):
+                    return result[len(prefix):].strip()
+        return None
+
+    def _checked(self, result):
         # Check if the result is an error message
-        if isinstance(result, str) and result.startswith("Error:"):
-            # Extract the error message
-            error_msg = result[7:].strip()
-            raise Exception(f"LLM execution failed: {error_msg}")
+        error_msg = self._error(result)
+        if error_msg is not None:
+            raise ProviderError(f"LLM execution failed: {error_msg}")
             
         return result
+
+    def _failed(self, error):
+        # A provider's exception as the error run() raises, keeping its HTTP status
+        return ProviderError(f"LLM execution failed: {str(error)}", error_status(error))
+
+    def stream(self, prompt, image_path=None, system=None):
+        """Stream the response text in chunks as the provider produces it.
+
+        Returns a TokenStream to iterate with `for`; it holds the full text
+        and time-to-first-token once consumed. Providers without native
+        streaming yield their full response once. Failures are raised the
+        same way as in run().
+        """
+        timeout = current_timeout(self.timeout)
+        return TokenStream(self._guarded_stream(prompt, image_path, system, timeout), served_by=self)
+
+    def astream(self, prompt, image_path=None, system=None):
+        """Stream the response text on the provider's async client.
+
+        Returns a TokenStream to iterate with `async for`; see stream().
+        """
+        timeout = current_timeout(self.timeout)
+        return TokenStream(self._guarded_astream(prompt, image_path, system, timeout), served_by=self)
+
+    def _guarded_stream(self, prompt, image_path, system, timeout):
+        # The provider slot is held until the stream ends
+        with self.guard.slot(deadline_bound=timeout < self.timeout):
+            if hasattr(self.agent, "stream"):
+                yield from self.agent.stream(prompt, image_path, system=system, timeout=timeout)
+            else:
+                yield from self._complete(prompt, image_path, system, timeout)
+
+    async def _guarded_astream(self, prompt, image_path, system, timeout):
+        async with self.guard.aslot(deadline_bound=timeout < self.timeout):
+            if hasattr(self.agent, "astream"):
+                chunks = self.agent.astream(prompt, image_path, system=system, timeout=timeout)
+            else:
+                chunks = self._acomplete(prompt, image_path, system, timeout)
+            async for delta in chunks:
+                yield delta
+
+    def _complete(self, prompt, image_path, system, timeout):
+        # A whole response as a single delta, for providers that cannot stream
+        result = self.agent.run(prompt, image_path, system=system, timeout=timeout)
+        error_msg = self._error(result)
+        if error_msg is not None:
+            raise Exception(error_msg)
+        yield result
+
+    async def _acomplete(self, prompt, image_path, system, timeout):
+        if hasattr(self.agent, "arun"):
+            result = await self.agent.arun(prompt, image_path, system=system, timeout=timeout)
+        else:
+            result = await run_blocking("llm", self.agent.run, prompt, image_path, system=system, timeout=timeout)
+        error_msg = self._error(result)
+        if error_msg is not None:
+            raise Exception(error_msg)
+        yield result
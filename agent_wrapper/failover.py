@@ -0,0 +1,280 @@
+import os
+import time
+import asyncio
+import threading
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+from services.deadline import DeadlineExceeded, current_timeout
+from services.logger import get_logger
+
+from .base_agent import AgentWrapper
+from .resilience import is_retryable
+from .streaming import TokenStream
+
+logger = get_logger(__name__)
+
+# Environment variable holding each provider's API key, in the default preference order
+API_KEY_ENV = {
+    "anthropic": "ANTHROPIC_API_KEY",
+    "openai": "OPENAI_API_KEY",
+    "gemini": "GEMINI_API_KEY",
+}
+
+def configured_providers() -> List[Tuple[str, str]]:
+    """
+    Providers to send LLM calls to, in order, with their API keys
+
+    LLM_PROVIDERS lists them explicitly (e.g. "anthropic,openai,gemini");
+    providers without an API key are skipped. Without it only the first
+    provider with a key is used, in the order of API_KEY_ENV.
+    """
+    listed = os.getenv("LLM_PROVIDERS")
+    names = [name.strip().lower() for name in listed.split(",") if name.strip()] if listed else list(API_KEY_ENV)
+    providers = []
+    for name in names:
+        if name not in API_KEY_ENV:
+            logger.warning("Ignoring unknown provider %r in LLM_PROVIDERS", name)
+            continue
+        api_key = os.getenv(API_KEY_ENV[name])
+        if api_key:
+            providers.append((name, api_key))
+        elif listed:
+            logger.warning("Skipping provider %s: %s is not set", name, API_KEY_ENV[name])
+    return providers if listed else providers[:1]
+
+class LatencyTracker:
+    """Recent successful call latencies per provider and kind ("run" or "ttft")"""
+
+    def __init__(self, size: int = 200):
+        self.size = size
+        self._samples: Dict[Tuple[str, str], Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, provider: str, kind: str, seconds: float):
+        with self._lock:
+            self._samples.setdefault((provider, kind), deque(maxlen=self.size)).append(seconds)
+
+    def percentile(self, provider: str, kind: str, percentile: float, min_samples: int) -> Optional[float]:
+        """The latency percentile, or None until there are min_samples observations"""
+        with self._lock:
+            samples = sorted(self._samples.get((provider, kind), ()))
+        if len(samples) < max(min_samples, 1):
+            return None
+        index = min(int(round(percentile / 100.0 * (len(samples) - 1))), len(samples) - 1)
+        return samples[index]
+
+# Shared by every failover wrapper in the process
+_latencies = LatencyTracker()
+
+class FailoverAgentWrapper:
+    """
+    AgentWrapper over an ordered list of providers.
+
+    Calls go to the first provider and fail over to the next on a retryable
+    error (a timeout or connection failure, 408/429/5xx, an overload, or a
+    call refused by the provider's circuit breaker or limiter); the last
+    error is raised when every provider fails. An error that says the request
+    itself is bad (another 4xx) is raised without trying further providers.
+    Streams fail over only until the first delta, after which the stream is
+    committed to its provider. run_served()/arun_served() and TokenStream's
+    served_by report which provider answered.
+
+    With hedging on, an async call whose provider has not answered (for
+    streams: produced a first token) within the LLM_HEDGE_PERCENTILE of that
+    provider's recent latency is also sent to the next provider, and the
+    first answer wins; the other call is cancelled. Hedging waits until
+    LLM_HEDGE_MIN_SAMPLES latencies have been observed. The sync run() and
+    stream() fail over but do not hedge.
+    """
+
+    def __init__(self, providers: List[Tuple[str, str]], hedge: bool = None, hedge_percentile: float = None,
+                 hedge_min_samples: int = None, hedge_min_delay: float = None):
+        if not providers:
+            raise ValueError("At least one provider is required")
+        self.wrappers = [AgentWrapper(framework, api_key) for framework, api_key in providers]
+        self.frameworks = [wrapper.framework for wrapper in self.wrappers]
+        # The primary's, for callers that need a provider before any call is served
+        self.framework = self.wrappers[0].framework
+        self.agent = self.wrappers[0].agent
+        self.hedge = hedge if hedge is not None else os.getenv("LLM_HEDGE", "false").lower() in ("1", "true", "yes")
+        self.hedge_percentile = hedge_percentile or float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+        self.hedge_min_samples = hedge_min_samples or int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+        self.hedge_min_delay = hedge_min_delay or float(os.getenv("LLM_HEDGE_MIN_DELAY", "1.0"))
+
+    def run(self, prompt, image_path=None, system=None):
+        """Run a prompt to completion, failing over between providers"""
+        return self.run_served(prompt, image_path, system)[1]
+
+    def run_served(self, prompt, image_path=None, system=None) -> Tuple[AgentWrapper, Any]:
+        """run(), also returning the wrapper whose provider served the call"""
+        error = None
+        for wrapper in self.wrappers:
+            try:
+                return wrapper, wrapper.run(prompt, image_path, system)
+            except DeadlineExceeded:
+                raise
+            except Exception as e:
+                if not is_retryable(e):
+                    raise
+                error = e
+                logger.warning("%s call failed (%s); failing over", wrapper.framework, e)
+        raise error
+
+    async def arun(self, prompt, image_path=None, system=None):
+        """Run a prompt to completion on the async clients, failing over and hedging between providers"""
+        return (await self.arun_served(prompt, image_path, system))[1]
+
+    async def arun_served(self, prompt, image_path=None, system=None) -> Tuple[AgentWrapper, Any]:
+        """arun(), also returning the wrapper whose provider served the call"""
+        async def start(wrapper):
+            started = time.monotonic()
+            result = await wrapper.arun(prompt, image_path, system)
+            _latencies.record(wrapper.framework, "run", time.monotonic() - started)
+            return result
+
+        return await self._race(start, "run")
+
+    def stream(self, prompt, image_path=None, system=None):
+        """Stream the response text, failing over between providers until the first delta"""
+        tokens = TokenStream(None)
+        tokens._chunks = self._failover_stream(prompt, image_path, system, tokens)
+        return tokens
+
+    def astream(self, prompt, image_path=None, system=None):
+        """Stream the response text on the async clients, failing over and hedging until the first delta"""
+        tokens = TokenStream(None)
+        tokens._chunks = self._failover_astream(prompt, image_path, system, tokens)
+        return tokens
+
+    async def aclose(self):
+        for wrapper in self.wrappers:
+            await wrapper.aclose()
+
+    def _failover_stream(self, prompt, image_path, system, tokens):
+        error = None
+        for wrapper in self.wrappers:
+            chunks = wrapper._guarded_stream(prompt, image_path, system, current_timeout(wrapper.timeout))
+            try:
+                first = next(chunks, None)
+            except DeadlineExceeded:
+                raise
+            except Exception as e:
+                if not is_retryable(e):
+                    raise
+                error = e
+                logger.warning("%s stream failed before its first token (%s); failing over", wrapper.framework, e)
+                continue
+            tokens.served_by = wrapper
+            if first is not None:
+                yield first
+            yield from chunks
+            return
+        raise error
+
+    async def _failover_astream(self, prompt, image_path, system, tokens):
+        async def start(wrapper):
+            started = time.monotonic()
+            chunks = wrapper._guarded_astream(prompt, image_path, system, current_timeout(wrapper.timeout))
+            try:
+                first = await chunks.__anext__()
+            except StopAsyncIteration:
+                first = None
+            except BaseException:
+                await chunks.aclose()
+                raise
+            _latencies.record(wrapper.framework, "ttft", time.monotonic() - started)
+            return chunks, first
+
+        async def discard(result):
+            await result[0].aclose()
+
+        tokens.served_by, (chunks, first) = await self._race(start, "ttft", discard)
+        try:
+            if first is not None:
+                yield first
+            async for delta in chunks:
+                yield delta
+        finally:
+            await chunks.aclose()
+
+    def _hedge_delay(self, wrapper: AgentWrapper, kind: str) -> Optional[float]:
+        # Seconds to wait on a provider before hedging, or None to wait for it
+        if not self.hedge:
+            return None
+        observed = _latencies.percentile(wrapper.framework, kind, self.hedge_percentile, self.hedge_min_samples)
+        return None if observed is None else max(observed, self.hedge_min_delay)
+
+    async def _race(self, start: Callable[[AgentWrapper], Awaitable[Any]], kind: str,
+                    discard: Callable[[Any], Awaitable[None]] = None) -> Tuple[AgentWrapper, Any]:
+        """
+        Run start(wrapper) over the providers in order until one succeeds
+
+        A call failing with a retryable error moves on to the next provider;
+        any other error stops new calls and is raised once no call that is
+        already running can still succeed. While a single call is
+        outstanding and hedging applies, the next provider is also started
+        once the call has run past its hedge delay; the first success wins
+        and the remaining calls are cancelled (and their results passed to
+        discard, if they finished at the same time).
+
+        Returns:
+            The winning wrapper and its result
+        """
+        candidates = deque(self.wrappers)
+        pending: Dict[asyncio.Task, Tuple[AgentWrapper, float]] = {}
+        error = None
+
+        def launch():
+            wrapper = candidates.popleft()
+            pending[asyncio.ensure_future(start(wrapper))] = (wrapper, time.monotonic())
+
+        launch()
+        winner = None
+        try:
+            while pending:
+                timeout = None
+                if len(pending) == 1 and candidates:
+                    wrapper, launched = next(iter(pending.values()))
+                    delay = self._hedge_delay(wrapper, kind)
+                    if delay is not None:
+                        timeout = max(delay - (time.monotonic() - launched), 0)
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    wrapper, _ = next(iter(pending.values()))
+                    logger.info("%s has not answered within its p%.0f latency; hedging to %s",
+                                wrapper.framework, self.hedge_percentile, candidates[0].framework)
+                    launch()
+                    continue
+
+                for task in done:
+                    wrapper, _ = pending.pop(task)
+                    if task.exception() is None:
+                        if winner is None:
+                            winner = (wrapper, task.result())
+                        elif discard:
+                            await discard(task.result())
+                        continue
+                    error = task.exception()
+                    if isinstance(error, DeadlineExceeded):
+                        raise error
+                    if not is_retryable(error):
+                        # The request itself was rejected; another provider would not do better
+                        candidates.clear()
+                    logger.warning("%s call failed (%s)%s", wrapper.framework, error, "; failing over" if candidates else "")
+                if winner:
+                    if len(self.wrappers) > 1 and winner[0] is not self.wrappers[0]:
+                        logger.info("Served by %s instead of %s", winner[0].framework, self.framework)
+                    return winner
+                if not pending and candidates:
+                    launch()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.wait(pending)
+                if discard:
+                    for task in pending:
+                        if not task.cancelled() and task.exception() is None:
+                            await discard(task.result())
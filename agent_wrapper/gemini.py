@@ -1,44 +1,219 @@
-import requests
+import os
+import json
 import time
+import random
+import asyncio
+import datetime
+from email.utils import parsedate_to_datetime
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+from services.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Status codes worth another attempt; any other error status fails immediately
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
 
 class GeminiAgent:
     def __init__(self, api_key):
         self.api_key = api_key
         self.url = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent"
+        # Server-sent events, one partial response per "data:" line
+        self.stream_url = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:streamGenerateContent?alt=sse"
+        self.headers = {
+            "Content-Type": "application/json",
+            "x-goog-api-key": self.api_key
+        }
+        self.max_retries = int(os.getenv("GEMINI_MAX_RETRIES", "4"))
+        self.backoff_base = float(os.getenv("GEMINI_BACKOFF_BASE", "1"))
+        self.backoff_max = float(os.getenv("GEMINI_BACKOFF_MAX", "30"))
+        self.pool_size = int(os.getenv("GEMINI_POOL_SIZE", "16"))
+
+        # Keep-alive session, so calls reuse TCP/TLS connections instead of opening one each
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size))
+        self.session.headers.update(self.headers)
+        self._async_client = None
+
+    @property
+    def async_client(self):
+        # Built on first use so it belongs to the running event loop
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(
+                headers=self.headers,
+                limits=httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size)
+            )
+        return self._async_client
+
+    def _retry_after(self, value):
+        # Retry-After is either a number of seconds or an HTTP date
+        if not value:
+            return None
+        try:
+            return max(float(value), 0.0)
+        except ValueError:
+            pass
+        try:
+            when = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if when.tzinfo is None:
+            when = when.replace(tzinfo=datetime.timezone.utc)
+        return max((when - datetime.datetime.now(datetime.timezone.utc)).total_seconds(), 0.0)
+
+    def _backoff(self, error, attempt, expires):
+        """Seconds to wait before retrying a failed attempt, or None to give up.
 
-    def run(self, prompt, image_path=None):
+        Only transport failures and retryable statuses are retried. The wait
+        is exponential with full jitter, at least as long as any Retry-After
+        the server sent, and never runs past the call's deadline.
+        """
+        response = getattr(error, "response", None)
+        status = getattr(response, "status_code", None)
+        if status is not None:
+            if status not in RETRYABLE_STATUS:
+                return None
+        elif not isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout, httpx.TransportError)):
+            return None
+        if attempt >= self.max_retries:
+            return None
+
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        server_delay = self._retry_after(response.headers.get("Retry-After")) if response is not None else None
+        if server_delay is not None:
+            delay = max(delay, server_delay)
+        if expires and time.monotonic() + delay >= expires:
+            return None
+        return delay
+
+    def _attempt_timeout(self, expires):
+        # Retries share the call's timeout rather than each getting a fresh one
+        return max(expires - time.monotonic(), 0.001) if expires else None
+
+    def _payload(self, prompt, image_path=None, system=None):
         if image_path:
             prompt += f" Also, use the information from this image: {image_path}"
 
-        delay = 1          # initial delay in seconds
-        max_delay = 60     # maximum delay allowed before giving up
+        payload = {
+            "contents": [{
+                "parts": [{
+                    "text": prompt
+                }]
+            }],
+            "generationConfig": {
+                "maxOutputTokens": 2048
+            }
+        }
+        if system:
+            # A stable system instruction lets Gemini's implicit caching reuse the prefix
+            payload["systemInstruction"] = {"parts": [{"text": "".join(system)}]}
+        return payload
+
+    def _text(self, data):
+        return data.get("candidates", [{}])[0].get("content", {}).get("parts", [{}])[0].get("text", "No response")
+
+    def _delta(self, line):
+        # Text of one streamed partial response, or None for blank and non-data lines
+        if not line or not line.startswith("data:"):
+            return None
+        data = json.loads(line[5:].strip())
+        parts = data.get("candidates", [{}])[0].get("content", {}).get("parts", [])
+        return "".join(part.get("text", "") for part in parts)
+
+    def run(self, prompt, image_path=None, system=None, timeout=None):
+        payload = self._payload(prompt, image_path, system)
+        expires = time.monotonic() + timeout if timeout else None
+        attempt = 0
 
         while True:
             try:
-                response = requests.post(
-                    self.url,
-                    headers={
-                        "Content-Type": "application/json",
-                        "x-goog-api-key": self.api_key
-                    },
-                    json={
-                        "contents": [{
-                            "parts": [{
-                                "text": prompt
-                            }]
-                        }],
-                        "generationConfig": {
-                            "maxOutputTokens": 2048
-                        }
-                    }
-                )
+                response = self.session.post(self.url, json=payload, timeout=self._attempt_timeout(expires))
                 response.raise_for_status()
                 # Parse the JSON response
-                return response.json().get("candidates", [{}])[0].get("content", {}).get("parts", [{}])[0].get("text", "No response")
+                return self._text(response.json())
             except Exception as e:
-                # If the delay exceeds the maximum allowed, return the error message.
-                if delay > max_delay:
-                    return f"Error: {str(e)}"
-                print(f"Request failed: {e}. Retrying in {delay} second(s)...")
+                delay = self._backoff(e, attempt, expires)
+                if delay is None:
+                    # The last error, with its response (and status) attached
+                    raise
+                logger.warning("Request failed: %s. Retrying in %.1f second(s)...", e, delay)
                 time.sleep(delay)
-                delay *= 2  # Double the delay for the next attempt
+                attempt += 1
+
+    async def arun(self, prompt, image_path=None, system=None, timeout=None):
+        # Same as run, on the async HTTP client; waiting between retries holds no thread
+        payload = self._payload(prompt, image_path, system)
+        expires = time.monotonic() + timeout if timeout else None
+        attempt = 0
+
+        while True:
+            try:
+                response = await self.async_client.post(self.url, json=payload, timeout=self._attempt_timeout(expires))
+                response.raise_for_status()
+                return self._text(response.json())
+            except Exception as e:
+                delay = self._backoff(e, attempt, expires)
+                if delay is None:
+                    raise
+                logger.warning("Request failed: %s. Retrying in %.1f second(s)...", e, delay)
+                await asyncio.sleep(delay)
+                attempt += 1
+
+    def stream(self, prompt, image_path=None, system=None, timeout=None):
+        # Failures before the first delta are retried like run; once text has
+        # been yielded a failure is raised, since a retry would repeat it
+        payload = self._payload(prompt, image_path, system)
+        expires = time.monotonic() + timeout if timeout else None
+        attempt = 0
+        started = False
+
+        while True:
+            try:
+                with self.session.post(self.stream_url, json=payload, stream=True, timeout=self._attempt_timeout(expires)) as response:
+                    response.raise_for_status()
+                    for line in response.iter_lines(decode_unicode=True):
+                        delta = self._delta(line)
+                        if delta:
+                            started = True
+                            yield delta
+                return
+            except Exception as e:
+                delay = None if started else self._backoff(e, attempt, expires)
+                if delay is None:
+                    raise
+                logger.warning("Stream request failed: %s. Retrying in %.1f second(s)...", e, delay)
+                time.sleep(delay)
+                attempt += 1
+
+    async def astream(self, prompt, image_path=None, system=None, timeout=None):
+        # Same as stream, on the async HTTP client
+        payload = self._payload(prompt, image_path, system)
+        expires = time.monotonic() + timeout if timeout else None
+        attempt = 0
+        started = False
+
+        while True:
+            try:
+                async with self.async_client.stream("POST", self.stream_url, json=payload, timeout=self._attempt_timeout(expires)) as response:
+                    response.raise_for_status()
+                    async for line in response.aiter_lines():
+                        delta = self._delta(line)
+                        if delta:
+                            started = True
+                            yield delta
+                return
+            except Exception as e:
+                delay = None if started else self._backoff(e, attempt, expires)
+                if delay is None:
+                    raise
+                logger.warning("Stream request failed: %s. Retrying in %.1f second(s)...", e, delay)
+                await asyncio.sleep(delay)
+                attempt += 1
+
+    async def aclose(self):
+        self.session.close()
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
@@ -1,4 +1,23 @@
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
+
+class _StreamStripper:
+    # Strips a streamed reply the way run() strips a whole one: leading
+    # whitespace is dropped and trailing whitespace is held back until more
+    # text follows it, so it never reaches the caller at the end of the stream
+    def __init__(self):
+        self.started = False
+        self.pending = ""
+
+    def feed(self, delta):
+        if not self.started:
+            delta = delta.lstrip()
+            if not delta:
+                return ""
+            self.started = True
+        text = self.pending + delta
+        stripped = text.rstrip()
+        self.pending = text[len(stripped):]
+        return stripped
 
 class OpenAIAgent:
     def __init__(self, api_key):
@@ -8,28 +27,94 @@ class OpenAIAgent:
             api_key=api_key,
             # Remove any parameters that might cause issues in older versions
         )
+        self.api_key = api_key
+        self.model = "o3-mini"
+        self._async_client = None
+
+    @property
+    def async_client(self):
+        # Built on first use so it belongs to the running event loop
+        if self._async_client is None:
+            self._async_client = AsyncOpenAI(api_key=self.api_key)
+        return self._async_client
+
+    def _build_messages(self, prompt, image_path=None, system=None):
+        # Build the conversation messages. The stable prefix goes first as the
+        # system message so OpenAI's automatic prefix caching can reuse it.
+        messages = [
+            {"role": "system", "content": "".join(system) if system else "You are a helpful assistant."},
+            {"role": "user", "content": prompt}
+        ]
+
+        if image_path:
+            messages.append({
+                "role": "user",
+                "content": f"This is the image path: {image_path}"
+            })
+
+        return messages
+
+    def run(self, prompt, image_path=None, system=None, timeout=None):
+        # Failures raise the SDK's errors (APIStatusError carries the HTTP status)
+        messages = self._build_messages(prompt, image_path, system)
+
+        # Call the ChatCompletion endpoint using the client
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            timeout=timeout
+        )
+
+        # Extract and return the assistant's reply
+        return response.choices[0].message.content.strip()
+
+    async def arun(self, prompt, image_path=None, system=None, timeout=None):
+        # Same as run, awaited on the async client
+        response = await self.async_client.chat.completions.create(
+            model=self.model,
+            messages=self._build_messages(prompt, image_path, system),
+            timeout=timeout
+        )
+        return response.choices[0].message.content.strip()
+
+    async def aclose(self):
+        if self._async_client is not None:
+            await self._async_client.close()
+            self._async_client = None
+
+    def stream(self, prompt, image_path=None, system=None, timeout=None):
+        # Stream the ChatCompletion and yield content deltas as they arrive,
+        # stripped like run()'s reply
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=self._build_messages(prompt, image_path, system),
+            stream=True,
+            timeout=timeout
+        )
+
+        stripper = _StreamStripper()
+        for chunk in response:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            text = stripper.feed(delta) if delta else ""
+            if text:
+                yield text
+
+    async def astream(self, prompt, image_path=None, system=None, timeout=None):
+        # Same as stream, on the async client
+        response = await self.async_client.chat.completions.create(
+            model=self.model,
+            messages=self._build_messages(prompt, image_path, system),
+            stream=True,
+            timeout=timeout
+        )
 
-    def run(self, prompt, image_path=None):
-        try:
-            # Build the conversation messages
-            messages = [
-                {"role": "system", "content": "You are a helpful assistant."},
-                {"role": "user", "content": prompt}
-            ]
-
-            if image_path:
-                messages.append({
-                    "role": "user",
-                    "content": f"This is the image path: {image_path}"
-                })
-
-            # Call the ChatCompletion endpoint using the client
-            response = self.client.chat.completions.create(
-                model="o3-mini",
-                messages=messages
-            )
-
-            # Extract and return the assistant's reply
-            return response.choices[0].message.content.strip()
-        except Exception as e:
-            return f"Error: {str(e)}"
+        stripper = _StreamStripper()
+        async for chunk in response:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            text = stripper.feed(delta) if delta else ""
+            if text:
+                yield text
@@ -0,0 +1,415 @@
+import os
+import time
+import asyncio
+import threading
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Dict, Optional
+
+from services.deadline import DeadlineExceeded, remaining
+from services.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Statuses that mark a provider as rate limiting or overloaded (Anthropic sends 529)
+OVERLOAD_STATUS = (429, 529)
+
+# Client error statuses that still say something about the provider's health
+PROVIDER_4XX_STATUS = (408, 429)
+
+# Error types and (for errors without a status, e.g. SSE error events) message
+# text that mark a provider as rate limiting or overloaded
+OVERLOAD_ERROR_TYPES = ("RateLimitError", "OverloadedError")
+OVERLOAD_MARKERS = ("rate limit", "rate_limit", "overloaded", "resource_exhausted", "too many requests")
+
+# Error types for a call that got no answer (connection failures and timeouts),
+# matched by class name so no provider SDK has to be imported
+TRANSIENT_ERROR_TYPES = ("APIConnectionError", "TransportError", "ConnectionError", "Timeout", "TimeoutError")
+
+# Error types for a call that timed out waiting for the provider (requests, httpx and the SDKs)
+TIMEOUT_ERROR_TYPES = ("Timeout", "TimeoutError", "TimeoutException", "APITimeoutError")
+
+class ProviderUnavailable(Exception):
+    """A provider call was refused without being sent: the circuit is open or the limiter is full"""
+
+    def __init__(self, provider: str, reason: str, retry_after: float):
+        self.provider = provider
+        self.reason = reason
+        self.retry_after = retry_after
+        super().__init__(f"{provider} unavailable: {reason}")
+
+class ProviderError(Exception):
+    """A provider call failed; carries the HTTP status when the provider answered with one"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        self.status_code = status_code
+        super().__init__(message)
+
+def error_status(error: Any) -> Optional[int]:
+    """HTTP status of a provider error (SDK, requests or httpx), or None if it has none"""
+    for source in (error, getattr(error, "response", None)):
+        status = getattr(source, "status_code", None)
+        if isinstance(status, int):
+            return status
+    return None
+
+def is_client_error(error: Any) -> bool:
+    """Whether the provider rejected the request itself (a 4xx other than 408/429) rather than failing"""
+    status = error_status(error)
+    return status is not None and 400 <= status < 500 and status not in PROVIDER_4XX_STATUS
+
+def is_overload(error: Any) -> bool:
+    """Whether an error is a rate-limit or overload response"""
+    status = error_status(error)
+    if status is not None:
+        return status in OVERLOAD_STATUS
+    if any(type(cause).__name__ in OVERLOAD_ERROR_TYPES for cause in (error, getattr(error, "__cause__", None))):
+        return True
+    text = str(error).lower()
+    return any(marker in text for marker in OVERLOAD_MARKERS)
+
+def is_retryable(error: Any) -> bool:
+    """
+    Whether another attempt (or another provider) could succeed where this error failed
+
+    True when the call was refused by the provider guard, the provider was
+    overloaded or answered 408/429/5xx, or no answer came back (connection
+    failure or timeout); False when the provider rejected the request itself.
+    """
+    if isinstance(error, ProviderUnavailable) or is_overload(error):
+        return True
+    status = error_status(error)
+    if status is not None:
+        return status in PROVIDER_4XX_STATUS or status >= 500
+    causes = [cause for cause in (error, getattr(error, "__cause__", None)) if cause is not None]
+    return any(cls.__name__ in TRANSIENT_ERROR_TYPES for cause in causes for cls in type(cause).__mro__)
+
+def is_timeout(error: Any) -> bool:
+    """Whether an error (or its cause) is a timeout waiting for the provider"""
+    causes = [cause for cause in (error, getattr(error, "__cause__", None)) if cause is not None]
+    return any(cls.__name__ in TIMEOUT_ERROR_TYPES for cause in causes for cls in type(cause).__mro__)
+
+class CircuitBreaker:
+    """
+    Fails calls to a provider fast while it is failing.
+
+    Outcomes over the last ``window`` seconds are tracked; a call slower than
+    ``slow_call_seconds`` counts as a failure. Once at least ``min_calls``
+    calls are in the window and the failure rate reaches ``error_rate`` the
+    circuit opens and calls are refused for ``open_seconds``. After that it
+    is half-open: ``half_open_calls`` trial calls go through, and the first
+    outcome closes the circuit again or re-opens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, provider: str, window: float = None, min_calls: int = None, error_rate: float = None,
+                 slow_call_seconds: float = None, open_seconds: float = None, half_open_calls: int = None):
+        self.provider = provider
+        self.window = window or float(os.getenv("CIRCUIT_WINDOW", "60"))
+        self.min_calls = min_calls or int(os.getenv("CIRCUIT_MIN_CALLS", "10"))
+        self.error_rate = error_rate or float(os.getenv("CIRCUIT_ERROR_RATE", "0.5"))
+        self.slow_call_seconds = slow_call_seconds or float(os.getenv("CIRCUIT_SLOW_CALL_SECONDS", "180"))
+        self.open_seconds = open_seconds or float(os.getenv("CIRCUIT_OPEN_SECONDS", "30"))
+        self.half_open_calls = half_open_calls or int(os.getenv("CIRCUIT_HALF_OPEN_CALLS", "1"))
+        self.state = self.CLOSED
+        self._outcomes: deque = deque()  # (finished_at, failed)
+        self._opened_at = 0.0
+        self._trials = 0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Whether a call may go through now (a half-open trial is counted as taken)"""
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.open_seconds:
+                    return False
+                self.state = self.HALF_OPEN
+                self._trials = 0
+                logger.info("Circuit for %s half-open; sending trial calls", self.provider)
+            if self.state == self.HALF_OPEN:
+                if self._trials >= self.half_open_calls:
+                    return False
+                self._trials += 1
+            return True
+
+    def record(self, failed: bool, latency: float):
+        """Record the outcome of a call that allow() let through"""
+        failed = failed or latency >= self.slow_call_seconds
+        now = time.monotonic()
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                if failed:
+                    self._open(now, "trial call failed")
+                else:
+                    self.state = self.CLOSED
+                    self._outcomes.clear()
+                    logger.info("Circuit for %s closed after a successful trial call", self.provider)
+                return
+            if self.state == self.OPEN:
+                return
+
+            self._outcomes.append((now, failed))
+            while self._outcomes and now - self._outcomes[0][0] > self.window:
+                self._outcomes.popleft()
+            failures = sum(1 for _, outcome in self._outcomes if outcome)
+            if len(self._outcomes) >= self.min_calls and failures / len(self._outcomes) >= self.error_rate:
+                self._open(now, f"{failures}/{len(self._outcomes)} calls failed in {self.window:.0f}s")
+
+    def abandon(self):
+        """Give back a half-open trial whose call ended without an outcome (e.g. cancelled)"""
+        with self._lock:
+            if self.state == self.HALF_OPEN and self._trials > 0:
+                self._trials -= 1
+
+    def retry_after(self) -> float:
+        """Seconds until the circuit will let a trial call through"""
+        return max(self.open_seconds - (time.monotonic() - self._opened_at), 0.0)
+
+    def _open(self, now: float, reason: str):
+        self.state = self.OPEN
+        self._opened_at = now
+        self._outcomes.clear()
+        logger.warning("Circuit for %s opened (%s); failing calls fast for %.0fs", self.provider, reason, self.open_seconds)
+
+class AdaptiveLimiter:
+    """
+    AIMD concurrency limit for calls to one provider.
+
+    Each successful call raises the limit by 1/limit (about one slot per
+    limit's worth of calls); a rate-limit or overload response multiplies it
+    by ``backoff``, at most once per ``decrease_interval`` so one burst of
+    429s counts once. Calls over the limit wait up to ``max_wait`` seconds
+    (or the request deadline, if sooner) and are then shed. Waiting threads
+    and coroutines sleep until release() (or a raised limit) wakes them.
+    """
+
+    def __init__(self, provider: str, initial: int = None, minimum: int = None, maximum: int = None,
+                 backoff: float = None, decrease_interval: float = None, max_wait: float = None):
+        self.provider = provider
+        self.minimum = minimum or int(os.getenv("LLM_CONCURRENCY_MIN", "1"))
+        self.maximum = maximum or int(os.getenv("LLM_CONCURRENCY_MAX", "64"))
+        self.limit = float(initial or int(os.getenv("LLM_CONCURRENCY_INITIAL", "16")))
+        self.backoff = backoff or float(os.getenv("LLM_CONCURRENCY_BACKOFF", "0.5"))
+        self.decrease_interval = decrease_interval or float(os.getenv("LLM_CONCURRENCY_DECREASE_INTERVAL", "2"))
+        self.max_wait = max_wait or float(os.getenv("LLM_LIMITER_MAX_WAIT", "10"))
+        self.in_flight = 0
+        self.shed = 0
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+        self._released = threading.Condition(self._lock)  # Wakes threads blocked in acquire()
+        self._async_waiters: deque = deque()  # (loop, future) per coroutine waiting in aacquire()
+
+    def _take(self) -> bool:
+        # Called with the lock held
+        if self.in_flight < int(self.limit):
+            self.in_flight += 1
+            return True
+        return False
+
+    def try_acquire(self) -> bool:
+        """Take a slot if one is free"""
+        with self._lock:
+            return self._take()
+
+    def _wake(self):
+        # Called with the lock held: wake one waiting thread and one waiting
+        # coroutine; whichever finds the slot taken goes back to waiting
+        self._released.notify()
+        while self._async_waiters:
+            loop, waiter = self._async_waiters.popleft()
+            try:
+                loop.call_soon_threadsafe(_wake_waiter, waiter)
+                return
+            except RuntimeError:
+                # Its event loop has closed
+                continue
+
+    def _wait_budget(self) -> float:
+        left = remaining()
+        return self.max_wait if left is None else max(min(self.max_wait, left), 0.0)
+
+    def _shed(self) -> ProviderUnavailable:
+        with self._lock:
+            self.shed += 1
+        logger.warning("Shedding %s call: %d calls in flight at limit %d", self.provider, self.in_flight, int(self.limit))
+        return ProviderUnavailable(self.provider, "concurrency limit reached", self.decrease_interval)
+
+    def acquire(self):
+        """Take a slot, blocking the thread while the limit is reached"""
+        expires = time.monotonic() + self._wait_budget()
+        with self._released:
+            while not self._take():
+                left = expires - time.monotonic()
+                if left <= 0:
+                    break
+                self._released.wait(left)
+            else:
+                return
+        raise self._shed()
+
+    async def aacquire(self):
+        """Take a slot, waiting without holding a thread while the limit is reached"""
+        expires = time.monotonic() + self._wait_budget()
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._lock:
+                if self._take():
+                    return
+                waiter = loop.create_future()
+                self._async_waiters.append((loop, waiter))
+            left = expires - time.monotonic()
+            try:
+                if left <= 0:
+                    raise asyncio.TimeoutError()
+                await asyncio.wait_for(waiter, left)
+            except BaseException as e:
+                with self._lock:
+                    if (loop, waiter) in self._async_waiters:
+                        self._async_waiters.remove((loop, waiter))
+                    else:
+                        # Woken but leaving: pass the wake-up on
+                        self._wake()
+                if isinstance(e, asyncio.TimeoutError):
+                    raise self._shed()
+                raise
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+            self._wake()
+
+    def on_success(self):
+        with self._lock:
+            previous = int(self.limit)
+            self.limit = min(float(self.maximum), self.limit + 1.0 / self.limit)
+            if int(self.limit) > previous:
+                self._wake()
+
+    def on_overload(self):
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_decrease < self.decrease_interval:
+                return
+            self._last_decrease = now
+            self.limit = max(float(self.minimum), self.limit * self.backoff)
+        logger.warning("%s is rate limiting; concurrency limit lowered to %d", self.provider, int(self.limit))
+
+class ProviderGuard:
+    """
+    Circuit breaker and adaptive limiter for one provider, shared by every agent using it.
+
+    Wrap each provider call in ``slot()`` (threads) or ``aslot()`` (event
+    loop). The call is refused with ProviderUnavailable while the circuit is
+    open or the limiter sheds it; otherwise its latency and outcome feed
+    both. An exception raised inside the block is a failure unless it is a
+    client error (a 4xx other than 408/429: the request was at fault, not
+    the provider), which neither trips the breaker nor grows the limit.
+
+    Pass ``deadline_bound=True`` when the call's timeout was shortened to
+    the request's deadline. A call cut short by the caller's deadline (it
+    timed out with a shortened timeout, or raised DeadlineExceeded) has no
+    outcome, like a cancelled call: only timeouts at the provider's own
+    configured timeout count as failures, so clients sending short
+    X-Request-Timeout deadlines cannot open the circuit for everyone.
+    """
+
+    def __init__(self, provider: str):
+        self.provider = provider
+        self.breaker = CircuitBreaker(provider)
+        self.limiter = AdaptiveLimiter(provider)
+        self.latency_ewma: Optional[float] = None
+
+    def _admit(self):
+        if not self.breaker.allow():
+            raise ProviderUnavailable(self.provider, "circuit open", self.breaker.retry_after())
+
+    def _finish(self, started: float, error: Optional[BaseException], deadline_bound: bool = False):
+        if isinstance(error, DeadlineExceeded) or (deadline_bound and is_timeout(error)):
+            # Cut short by the caller's deadline: says nothing about the provider
+            self.breaker.abandon()
+            return
+        latency = time.monotonic() - started
+        self.latency_ewma = latency if self.latency_ewma is None else 0.8 * self.latency_ewma + 0.2 * latency
+        self.breaker.record(error is not None and not is_client_error(error), latency)
+        if error is None:
+            self.limiter.on_success()
+        elif is_overload(error):
+            self.limiter.on_overload()
+
+    @contextmanager
+    def slot(self, deadline_bound: bool = False):
+        self._admit()
+        try:
+            self.limiter.acquire()
+        except BaseException:
+            self.breaker.abandon()
+            raise
+        started = time.monotonic()
+        finished = False
+        try:
+            yield
+            self._finish(started, None)
+            finished = True
+        except Exception as e:
+            self._finish(started, e, deadline_bound)
+            finished = True
+            raise
+        finally:
+            if not finished:
+                self.breaker.abandon()
+            self.limiter.release()
+
+    @asynccontextmanager
+    async def aslot(self, deadline_bound: bool = False):
+        self._admit()
+        try:
+            await self.limiter.aacquire()
+        except BaseException:
+            self.breaker.abandon()
+            raise
+        started = time.monotonic()
+        finished = False
+        try:
+            yield
+            self._finish(started, None)
+            finished = True
+        except Exception as e:
+            self._finish(started, e, deadline_bound)
+            finished = True
+            raise
+        finally:
+            if not finished:
+                # Cancelled or closed early: no outcome to record
+                self.breaker.abandon()
+            self.limiter.release()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "circuit": self.breaker.state,
+            "concurrency_limit": int(self.limiter.limit),
+            "in_flight": self.limiter.in_flight,
+            "shed": self.limiter.shed,
+            "latency_ewma": round(self.latency_ewma, 3) if self.latency_ewma is not None else None
+        }
+
+def _wake_waiter(waiter: asyncio.Future):
+    if not waiter.done():
+        waiter.set_result(None)
+
+# One guard per provider per process
+_guards: Dict[str, ProviderGuard] = {}
+_guards_lock = threading.Lock()
+
+def get_provider_guard(provider: str) -> ProviderGuard:
+    """Get the shared guard for a provider"""
+    with _guards_lock:
+        if provider not in _guards:
+            _guards[provider] = ProviderGuard(provider)
+        return _guards[provider]
+
+def get_provider_stats() -> Dict[str, Dict[str, Any]]:
+    """Breaker and limiter state for every provider used so far"""
+    return {provider: guard.get_stats() for provider, guard in _guards.items()}
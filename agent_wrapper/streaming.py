@@ -0,0 +1,73 @@
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+from .resilience import ProviderError, ProviderUnavailable, error_status
+
+class TokenStream:
+    """Text deltas from one provider call, consumed with `for` or `async for`.
+
+    Wraps a provider's sync or async delta iterator. Once iteration finishes,
+    `text` holds the full response as run() would have returned it, `ttft`
+    the seconds from the start of iteration to the first non-empty delta and
+    `elapsed` the seconds to the end of the stream. Provider failures are
+    raised as ProviderError("LLM execution failed: ...") the same way run()
+    raises them;
+    a call refused by the provider guard raises ProviderUnavailable.
+    `served_by` is the AgentWrapper whose provider produced the text (with
+    failover, known once the first delta has arrived).
+    """
+
+    def __init__(self, chunks, served_by=None):
+        self._chunks = chunks
+        self.served_by = served_by
+        self.deltas: List[str] = []
+        self.started: Optional[float] = None
+        self.ttft: Optional[float] = None
+        self.elapsed: Optional[float] = None
+
+    @property
+    def text(self) -> str:
+        """Response text received so far"""
+        return "".join(self.deltas)
+
+    def _record(self, delta: str):
+        if self.ttft is None:
+            self.ttft = time.monotonic() - self.started
+        self.deltas.append(delta)
+
+    def __iter__(self) -> Iterator[str]:
+        self.started = time.monotonic()
+        try:
+            for delta in self._chunks:
+                if delta:
+                    self._record(delta)
+                    yield delta
+        except (ProviderUnavailable, ProviderError):
+            raise
+        except Exception as e:
+            raise ProviderError(f"LLM execution failed: {str(e)}", error_status(e)) from e
+        finally:
+            self.elapsed = time.monotonic() - self.started
+
+    async def __aiter__(self) -> AsyncIterator[str]:
+        self.started = time.monotonic()
+        try:
+            async for delta in self._chunks:
+                if delta:
+                    self._record(delta)
+                    yield delta
+        except (ProviderUnavailable, ProviderError):
+            raise
+        except Exception as e:
+            raise ProviderError(f"LLM execution failed: {str(e)}", error_status(e)) from e
+        finally:
+            self.elapsed = time.monotonic() - self.started
+
+    def report(self) -> Dict[str, Any]:
+        """Timings and size of the stream, for response metadata and logs"""
+        return {
+            "ttft": round(self.ttft, 3) if self.ttft is not None else None,
+            "elapsed": round(self.elapsed, 3) if self.elapsed is not None else None,
+            "deltas": len(self.deltas),
+            "chars": sum(len(delta) for delta in self.deltas)
+        }
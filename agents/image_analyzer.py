@@ -13,6 +13,10 @@ from PIL import Image
 # For PDF processing
 import fitz  # PyMuPDF
 
+from services.logger import get_logger
+
+logger = get_logger(__name__)
+
 def extract_images_from_pdf(pdf_path: str) -> List[Dict[str, Any]]:
     """
     Extract images from a PDF file with position information.
@@ -86,7 +90,7 @@ def extract_images_from_pdf(pdf_path: str) -> List[Dict[str, Any]]:
         return images
     
     except Exception as e:
-        print(f"Error extracting images from PDF: {str(e)}")
+        logger.error("Error extracting images from PDF: %s", e)
         return []
 
 def extract_images_from_docx(docx_path: str) -> List[Dict[str, Any]]:
@@ -147,7 +151,7 @@ def extract_images_from_docx(docx_path: str) -> List[Dict[str, Any]]:
                                 
                                 embedded_images.append(image_data)
                             except Exception as e:
-                                print(f"Error processing image in DOCX: {str(e)}")
+                                logger.error("Error processing image in DOCX: %s", e)
                     
                     images.extend(embedded_images)
         
@@ -165,7 +169,7 @@ def extract_images_from_docx(docx_path: str) -> List[Dict[str, Any]]:
         return images
     
     except Exception as e:
-        print(f"Error extracting images from DOCX: {str(e)}")
+        logger.error("Error extracting images from DOCX: %s", e)
         return []
 
 def extract_tables_from_pdf(pdf_path: str) -> List[Dict[str, Any]]:
@@ -230,7 +234,7 @@ def extract_tables_from_pdf(pdf_path: str) -> List[Dict[str, Any]]:
         return tables
     
     except Exception as e:
-        print(f"Error extracting tables from PDF: {str(e)}")
+        logger.error("Error extracting tables from PDF: %s", e)
         return []
 
 def analyze_document_design(file_path: str) -> Dict[str, Any]:
@@ -280,7 +284,7 @@ def analyze_document_design(file_path: str) -> Dict[str, Any]:
                 }
                 design_info["layout_elements"].append(layout_data)
         except Exception as e:
-            print(f"Error analyzing PDF layout: {str(e)}")
+            logger.error("Error analyzing PDF layout: %s", e)
     
     elif file_extension in ['.docx', '.doc']:
         # Extract images
@@ -316,7 +320,7 @@ def analyze_document_design(file_path: str) -> Dict[str, Any]:
                 "tables": table_count
             }]
         except Exception as e:
-            print(f"Error analyzing DOCX layout: {str(e)}")
+            logger.error("Error analyzing DOCX layout: %s", e)
     
     return design_info
 
@@ -3,6 +3,10 @@
 import os
 from typing import Dict, List, Optional, Any
 
+from services.logger import get_logger
+
+logger = get_logger(__name__)
+
 def load_knowledge_base_content(knowledge_base_dir: str) -> Dict[str, str]:
     """Load content from all files in the knowledge_base directory.
     
@@ -53,9 +57,9 @@ def load_knowledge_base_content(knowledge_base_dir: str) -> Dict[str, str]:
                                     
                             knowledge_base[rel_path] = content
                         except Exception as e:
-                            print(f"Error loading knowledge base file {rel_path}: {str(e)}")
+                            logger.error("Error loading knowledge base file %s: %s", rel_path, e)
     except Exception as e:
-        print(f"Error loading knowledge base: {str(e)}")
+        logger.error("Error loading knowledge base: %s", e)
         
     return knowledge_base
 
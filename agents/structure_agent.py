@@ -5,10 +5,17 @@ import argparse
 import traceback
 from typing import Optional, Dict, List, Any
 
+# Add the parent directory to sys.path to allow imports from agent_wrapper and services
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.logger import get_logger
+
+logger = get_logger(__name__)
+
 # Try to import dotenv, but continue even if it's not available
 try:
     from dotenv import load_dotenv
-    print("Successfully imported dotenv module")
+    logger.debug("Successfully imported dotenv module")
     # Try to load environment variables from .env file
     try:
         # Look for .env file in current directory and parent directories
@@ -23,19 +30,18 @@ try:
         env_loaded = False
         for env_path in env_paths:
             if os.path.exists(env_path):
-                print(f"Loading environment variables from: {env_path}")
+                logger.info("Loading environment variables from: %s", env_path)
                 load_dotenv(env_path)
                 env_loaded = True
                 break
                 
         if not env_loaded:
-            print("Warning: No .env file found in search paths")
+            logger.warning("No .env file found in search paths")
     except Exception as e:
-        print(f"Warning: Failed to load .env file: {str(e)}")
-        print(traceback.format_exc())
+        logger.exception("Failed to load .env file: %s", e)
         
 except ImportError:
-    print("Warning: python-dotenv module not found. Environment variables must be set manually.")
+    logger.warning("python-dotenv module not found. Environment variables must be set manually.")
 
 # Use a direct import since the file is in the same directory
 try:
@@ -45,20 +51,19 @@ except ImportError:
     try:
         from agents.image_analyzer import get_document_design_summary, analyze_document_design
     except ImportError:
-        print("Warning: Could not import image analysis functions - advanced document design analysis disabled")
+        logger.warning("Could not import image analysis functions - advanced document design analysis disabled")
         # Create dummy functions to prevent errors
         def get_document_design_summary(file_path):
             return "Design analysis unavailable"
         def analyze_document_design(file_path):
             return {"has_images": False, "image_count": 0, "has_tables": False, "table_count": 0}
 
-# Add the parent directory to sys.path to allow imports from agent_wrapper
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
 # Load environment variables for API keys
 load_dotenv()
 
 from agent_wrapper.base_agent import AgentWrapper
+from agent_wrapper.resilience import ProviderError, ProviderUnavailable
+from services.deadline import ClientDisconnected, DeadlineExceeded
 
 class StructureAgent:
     """A document structure analyzer agent.
@@ -286,16 +291,19 @@ Your analysis should be so thorough and precise that it could serve as a bluepri
     def __init__(self, 
                  framework: str = "openai", 
                  api_key: Optional[str] = None,
-                 system_prompt: Optional[str] = None):
+                 system_prompt: Optional[str] = None,
+                 agent_wrapper: Optional[Any] = None):
         """Initialize the StructureAgent.
         
         Args:
             framework (str): The LLM framework to use (e.g., "anthropic", "openai").
             api_key (str, optional): API key for the chosen framework.
             system_prompt (str, optional): Custom system prompt override.
+            agent_wrapper (optional): Prebuilt wrapper to call the LLM through
+                (e.g. a FailoverAgentWrapper), instead of one for `framework`.
         """
         self.framework = framework
-        self.agent_wrapper = AgentWrapper(framework, api_key)
+        self.agent_wrapper = agent_wrapper or AgentWrapper(framework, api_key)
         self.system_prompt = system_prompt or self.DEFAULT_SYSTEM_PROMPT
         self.documents_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'documents')
     
@@ -324,29 +332,29 @@ Your analysis should be so thorough and precise that it could serve as a bluepri
                 file_path = os.path.join(self.documents_dir, filename)
                 
             if not os.path.exists(file_path):
-                print(f"Error: File not found: {file_path}")
+                logger.error("File not found: %s", file_path)
                 return f"Error: File not found: {file_path}"
                 
             file_extension = os.path.splitext(file_path)[1].lower()
-            print(f"Processing file: {file_path} with extension {file_extension}")
+            logger.info("Processing file: %s with extension %s", file_path, file_extension)
             
             # Extract text content based on file type
             content = ""
             
             # Handle PDF files
             if file_extension == '.pdf':
-                print("Detected PDF file, extracting content...")
+                logger.info("Detected PDF file, extracting content...")
                 # Try to use PyMuPDF (fitz) first for better extraction
                 try:
                     import fitz  # PyMuPDF
-                    print("Using PyMuPDF for extraction")
+                    logger.info("Using PyMuPDF for extraction")
                     doc = fitz.open(file_path)
                     content = ""
                     for page_num, page in enumerate(doc):
                         content += f"=== Page {page_num+1} ===\n"
                         content += page.get_text() + "\n\n"
                 except ImportError as e:
-                    print(f"PyMuPDF not available: {str(e)}, falling back to PyPDF2")
+                    logger.info("PyMuPDF not available: %s, falling back to PyPDF2", e)
                     # Fall back to PyPDF2
                     try:
                         import PyPDF2
@@ -358,19 +366,18 @@ Your analysis should be so thorough and precise that it could serve as a bluepri
                                     content += f"=== Page {page_num+1} ===\n"
                                     content += page_text + "\n\n"
                     except ImportError as e2:
-                        print(f"PyPDF2 not available either: {str(e2)}")
+                        logger.info("PyPDF2 not available either: %s", e2)
                         return f"Error: Missing libraries to process PDF files. Please install PyMuPDF or PyPDF2."
                     except Exception as e2:
-                        print(f"Error with PyPDF2: {str(e2)}")
+                        logger.error("Error with PyPDF2: %s", e2)
                         return f"Error processing PDF with PyPDF2: {str(e2)}"
                 except Exception as e:
-                    print(f"Error with PyMuPDF: {str(e)}")
-                    print(traceback.format_exc())
+                    logger.exception("Error with PyMuPDF: %s", e)
                     return f"Error processing PDF with PyMuPDF: {str(e)}"
             
             # Handle Word documents
             elif file_extension in ['.docx', '.doc']:
-                print("Detected Word document, extracting content...")
+                logger.info("Detected Word document, extracting content...")
                 try:
                     import docx
                     doc = docx.Document(file_path)
@@ -387,43 +394,41 @@ Your analysis should be so thorough and precise that it could serve as a bluepri
                             content += row_text + "\n"
                         content += "=== END TABLE ===\n\n"
                 except ImportError as e:
-                    print(f"python-docx not available: {str(e)}")
+                    logger.info("python-docx not available: %s", e)
                     return f"Error: Missing library to process Word documents. Please install python-docx."
                 except Exception as e:
-                    print(f"Error processing Word document: {str(e)}")
-                    print(traceback.format_exc())
+                    logger.exception("Error processing Word document: %s", e)
                     return f"Error processing Word document: {str(e)}"
             
             # Default case: treat as text file
             else:
-                print(f"Treating as text file with extension: {file_extension}")
+                logger.info("Treating as text file with extension: %s", file_extension)
                 try:
                     with open(file_path, 'r', encoding='utf-8', errors='replace') as file:
                         content = file.read()
                 except Exception as e:
-                    print(f"Error reading text file: {str(e)}")
+                    logger.error("Error reading text file: %s", e)
                     # Try binary mode as fallback
                     try:
                         with open(file_path, 'rb') as file:
                             content = file.read().decode('utf-8', errors='replace')
                     except Exception as e2:
-                        print(f"Error reading file in binary mode: {str(e2)}")
+                        logger.error("Error reading file in binary mode: %s", e2)
                         return f"Error: Could not read file content: {str(e2)}"
             
             # Add design analysis information to the content
             try:
-                print("Adding design summary...")
+                logger.info("Adding design summary...")
                 design_summary = get_document_design_summary(file_path)
                 full_content = content.strip() + "\n\n" + design_summary
                 return full_content
             except Exception as e:
-                print(f"Warning: Design analysis failed for {filename}: {str(e)}")
+                logger.warning("Design analysis failed for %s: %s", filename, e)
                 # Return content without design summary if it fails
                 return content.strip()
                     
         except Exception as e:
-            print(f"Unexpected error in get_example_document: {str(e)}")
-            print(traceback.format_exc())
+            logger.exception("Unexpected error in get_example_document: %s", e)
             return f"Error loading example document {filename}: {str(e)}"
     
     def list_available_examples(self) -> List[str]:
@@ -447,7 +452,7 @@ Your analysis should be so thorough and precise that it could serve as a bluepri
             
             return result
         except Exception as e:
-            print(f"Error listing example documents: {str(e)}")
+            logger.error("Error listing example documents: %s", e)
             return []
     
     def analyze_structure(self, example_filenames: List[str]) -> Dict[str, Any]:
@@ -460,91 +465,138 @@ Your analysis should be so thorough and precise that it could serve as a bluepri
             Dict[str, Any]: A structured template of the document type in JSON format.
         """
         try:
-            # Only use the first example to prevent token limit issues
-            if len(example_filenames) > 1:
-                print(f"\nNote: Using only the first example document for analysis to prevent token limit issues.")
-                example_filenames = example_filenames[:1]
+            prompt = self.build_analysis_prompt(example_filenames)
+            if prompt is None:
+                return None
             
-            # Build the prompt for the LLM
-            prompt = self.system_prompt + "\n\n"
+            # Use the agent wrapper to generate the analysis
+            logger.info("Analyzing structure of: %s (this may take a minute)...", example_filenames[0])
+            response = self.agent_wrapper.run(prompt, system=[self.system_prompt])
+            return self.parse_structure(response)
+        except Exception as e:
+            logger.exception("Unexpected error in analyze_structure: %s", e)
+            return None
+    
+    async def aanalyze_structure(self, prompt: str) -> Dict[str, Any]:
+        """Analyze a prompt from build_analysis_prompt on the provider's async client.
+        
+        Building the prompt reads and extracts the example files, so callers
+        run that step on the blocking pool and await only the LLM call here.
+        
+        Args:
+            prompt (str): Analysis prompt from build_analysis_prompt.
             
-            # Add examples if provided
-            prompt += "EXAMPLE DOCUMENT TO ANALYZE:\n"
-            for filename in example_filenames:
-                # Get document content
-                print(f"Getting content for document: {filename}")
-                example_content = self.get_example_document(filename)
-                
-                # Check if there was an error getting the document
-                if example_content.startswith("Error:"):
-                    print(f"Error getting document content: {example_content}")
-                    return None
-                
-                # Truncate if too long (model context window limitation)
-                if len(example_content) > 10000:  # Pick a reasonable limit
-                    print(f"Document content too long ({len(example_content)} chars), truncating to 10000 chars")
-                    example_content = example_content[:10000] + "\n... [Content truncated due to length]\n"
-                
-                prompt += f"\n--- {filename} ---\n{example_content}\n\n"
+        Returns:
+            Dict[str, Any]: A structured template of the document type in JSON format.
             
-            # Add more specific instructions for better structure extraction
-            prompt += """
-            Analyze the example document and extract a structured JSON template that captures its organization.
-            Focus on identifying:
-            1. The document type (e.g., 'Job Description', 'Analyst Report', etc.)
-            2. The major sections and their purpose
-            3. The formatting and style patterns
-            4. Key components that should be included
+        Raises:
+            ProviderUnavailable: If the provider's circuit is open or its limiter is full.
+            ProviderError: If the provider call failed.
+            DeadlineExceeded: If the request's deadline passed during the call.
+            ClientDisconnected: If the client went away during the call.
+        """
+        try:
+            response = await self.agent_wrapper.arun(prompt, system=[self.system_prompt])
+            return self.parse_structure(response)
+        except (ProviderUnavailable, ProviderError, DeadlineExceeded, ClientDisconnected):
+            # Let the caller map refusals, provider failures and deadlines to their statuses
+            raise
+        except Exception as e:
+            logger.exception("Unexpected error in aanalyze_structure: %s", e)
+            return None
+    
+    def build_analysis_prompt(self, example_filenames: List[str]) -> Optional[str]:
+        """Build the structure analysis prompt for example documents.
+        
+        Args:
+            example_filenames (List[str]): List of example filenames to analyze.
             
-            Your output MUST be a valid JSON object with the following structure:
-            {
-              "document_type": "[Type of document]",
-              "sections": [
-                {
-                  "name": "[Section name]",
-                  "description": "[Purpose of section]",
-                  "typical_content": "[What goes here]"
-                },
-                ...
-              ],
-              "overall_tone": "[Formal/Informal/etc.]",
-              "formatting_notes": "[Special formatting observed]"
-            }
+        Returns:
+            Optional[str]: The prompt, or None if a document could not be read.
+        """
+        # Only use the first example to prevent token limit issues
+        if len(example_filenames) > 1:
+            logger.info("Note: Using only the first example document for analysis to prevent token limit issues.")
+            example_filenames = example_filenames[:1]
+        
+        # Build the prompt for the LLM; the system prompt is sent separately as a cacheable prefix
+        prompt = "EXAMPLE DOCUMENT TO ANALYZE:\n"
+        for filename in example_filenames:
+            # Get document content
+            logger.info("Getting content for document: %s", filename)
+            example_content = self.get_example_document(filename)
             
-            Ensure your response is ONLY the JSON object, with no additional text before or after.
-            """
+            # Check if there was an error getting the document
+            if example_content.startswith("Error:"):
+                logger.error("Error getting document content: %s", example_content)
+                return None
             
-            # Use the agent wrapper to generate the analysis
-            print(f"\nAnalyzing structure of: {example_filenames[0]} (this may take a minute)...")
-            response = self.agent_wrapper.run(prompt)
+            # Truncate if too long (model context window limitation)
+            if len(example_content) > 10000:  # Pick a reasonable limit
+                logger.info("Document content too long (%s chars), truncating to 10000 chars", len(example_content))
+                example_content = example_content[:10000] + "\n... [Content truncated due to length]\n"
             
-            # Attempt to parse response as JSON
-            try:
-                # Find JSON in the response (it might have explanation text around it)
-                json_start = response.find('{')
-                json_end = response.rfind('}') + 1
-                
-                if json_start >= 0 and json_end > json_start:
-                    json_str = response[json_start:json_end]
-                    print(f"Extracted JSON string: {json_str[:100]}...")
-                    parsed_json = json.loads(json_str)
-                    print(f"\nSuccessfully extracted document structure.")
-                    return parsed_json
-                else:
-                    print(f"\nWarning: No valid JSON structure found in the response.")
-                    print(f"Response: {response[:200]}...")
-                    return None
-            except json.JSONDecodeError as e:
-                print(f"\nWarning: Could not parse JSON from response: {e}")
-                print(f"JSON string: {json_str[:200]}...")
-                return None
-            except Exception as e:
-                print(f"\nError extracting document structure: {str(e)}")
-                print(traceback.format_exc())
+            prompt += f"\n--- {filename} ---\n{example_content}\n\n"
+        
+        # Add more specific instructions for better structure extraction
+        prompt += """
+        Analyze the example document and extract a structured JSON template that captures its organization.
+        Focus on identifying:
+        1. The document type (e.g., 'Job Description', 'Analyst Report', etc.)
+        2. The major sections and their purpose
+        3. The formatting and style patterns
+        4. Key components that should be included
+        
+        Your output MUST be a valid JSON object with the following structure:
+        {
+          "document_type": "[Type of document]",
+          "sections": [
+            {
+              "name": "[Section name]",
+              "description": "[Purpose of section]",
+              "typical_content": "[What goes here]"
+            },
+            ...
+          ],
+          "overall_tone": "[Formal/Informal/etc.]",
+          "formatting_notes": "[Special formatting observed]"
+        }
+        
+        Ensure your response is ONLY the JSON object, with no additional text before or after.
+        """
+        return prompt
+    
+    def parse_structure(self, response: str) -> Optional[Dict[str, Any]]:
+        """Parse the structure template out of an analysis response.
+        
+        Args:
+            response (str): The LLM's response to the analysis prompt.
+            
+        Returns:
+            Optional[Dict[str, Any]]: The structure, or None if no valid JSON was found.
+        """
+        # Attempt to parse response as JSON
+        try:
+            # Find JSON in the response (it might have explanation text around it)
+            json_start = response.find('{')
+            json_end = response.rfind('}') + 1
+            
+            if json_start >= 0 and json_end > json_start:
+                json_str = response[json_start:json_end]
+                logger.debug("Extracted JSON string: %s...", json_str[:100])
+                parsed_json = json.loads(json_str)
+                logger.info("Successfully extracted document structure.")
+                return parsed_json
+            else:
+                logger.warning("No valid JSON structure found in the response.")
+                logger.debug("Response: %s...", response[:200])
                 return None
+        except json.JSONDecodeError as e:
+            logger.warning("Could not parse JSON from response: %s", e)
+            logger.debug("JSON string: %s...", json_str[:200])
+            return None
         except Exception as e:
-            print(f"\nUnexpected error in analyze_structure: {str(e)}")
-            print(traceback.format_exc())
+            logger.exception("Error extracting document structure: %s", e)
             return None
 
 
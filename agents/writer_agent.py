@@ -11,6 +11,9 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 load_dotenv()
 
 from agent_wrapper.base_agent import AgentWrapper
+from services.logger import get_logger
+
+logger = get_logger(__name__)
 
 class WriterAgent:
     """A document writer agent that leverages LLM capabilities.
@@ -47,16 +50,19 @@ class WriterAgent:
     def __init__(self, 
                  framework: str = "anthropic", 
                  api_key: Optional[str] = None,
-                 system_prompt: Optional[str] = None):
+                 system_prompt: Optional[str] = None,
+                 agent_wrapper: Optional[Any] = None):
         """Initialize the WriterAgent.
         
         Args:
             framework (str): The LLM framework to use (e.g., "anthropic", "openai").
             api_key (str, optional): API key for the chosen framework.
             system_prompt (str, optional): Custom system prompt override.
+            agent_wrapper (optional): Prebuilt wrapper to call the LLM through
+                (e.g. a FailoverAgentWrapper), instead of one for `framework`.
         """
         self.framework = framework
-        self.agent_wrapper = AgentWrapper(framework, api_key)
+        self.agent_wrapper = agent_wrapper or AgentWrapper(framework, api_key)
         self.system_prompt = system_prompt or self.DEFAULT_SYSTEM_PROMPT
         
         # Set directories for examples and knowledge base
@@ -134,7 +140,7 @@ class WriterAgent:
             
             return result
         except Exception as e:
-            print(f"Error listing example documents: {str(e)}")
+            logger.error("Error listing example documents: %s", e)
             return []
     
     def load_knowledge_base_content(self) -> Dict[str, str]:
@@ -184,9 +190,9 @@ class WriterAgent:
                                         
                                 knowledge_base[rel_path] = content
                             except Exception as e:
-                                print(f"Error loading knowledge base file {rel_path}: {str(e)}")
+                                logger.error("Error loading knowledge base file %s: %s", rel_path, e)
         except Exception as e:
-            print(f"Error loading knowledge base: {str(e)}")
+            logger.error("Error loading knowledge base: %s", e)
             
         return knowledge_base
     
@@ -200,8 +206,8 @@ class WriterAgent:
         Returns:
             str: The generated document.
         """
-        # Build the prompt for the LLM
-        prompt = self.system_prompt + "\n\n"
+        # Build the prompt for the LLM; the system prompt is sent separately as a cacheable prefix
+        prompt = ""
         
         # Add examples if provided
         if example_filenames:
@@ -215,7 +221,7 @@ class WriterAgent:
         prompt += "Please create a new document based on the examples and user requirements:"
         
         # Use the agent wrapper to generate the document
-        return self.agent_wrapper.run(prompt)
+        return self.agent_wrapper.run(prompt, system=[self.system_prompt])
     
     def create_document_with_structure(self, user_input: str, structure: Dict[str, Any], example_filenames: Optional[List[str]] = None) -> str:
         """Create a new document based on user input, a predefined structure, and knowledge base data.
@@ -228,13 +234,11 @@ class WriterAgent:
         Returns:
             str: The generated document.
         """
-        # Build the prompt for the LLM
-        prompt = self.system_prompt + "\n\n"
-        
-        # Add document structure
-        prompt += "DOCUMENT STRUCTURE TEMPLATE:\n"
-        prompt += json.dumps(structure, indent=2) + "\n\n"
-        prompt += """
+        # Build the stable prefix (system prompt, then the structure) separately from
+        # the per-request content so providers can cache it
+        structure_block = "DOCUMENT STRUCTURE TEMPLATE:\n"
+        structure_block += json.dumps(structure, indent=2) + "\n\n"
+        structure_block += """
         Follow this document structure template carefully when creating the new document.
         The structure template is a JSON object that defines the sections and subsections of the document.
         Output the document in markdown format.
@@ -255,6 +259,7 @@ class WriterAgent:
         * Use angle brackets for URLs
         \n\n
         """
+        prompt = ""
         
         # Load and incorporate knowledge base content
         knowledge_base = self.load_knowledge_base_content()
@@ -284,7 +289,7 @@ class WriterAgent:
         prompt += "Please create a new document based on the structure template, user requirements, and Knowledge Base. Focus on using factual information from the Knowledge Base while following the document structure and addressing user requirements."
         
         # Use the agent wrapper to generate the document
-        return self.agent_wrapper.run(prompt)
+        return self.agent_wrapper.run(prompt, system=[self.system_prompt + "\n\n", structure_block])
 
 
 def main():
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Load test for the Search Wizard API
+
+Keeps a number of /generate-document requests in flight against a running
+server while polling /health, then reports /health latency percentiles with
+and without the generation load. With blocking provider calls moved off the
+event loop, the loaded p99 should stay close to the idle p99.
+
+Per-user admission limits apply to the caller's identity: pass --token
+(a Supabase access token) to run as one user, and raise ADMISSION_USER_LIMIT
+on the server to at least --generations, or the extra requests get 429s.
+
+Usage:
+    python load_test.py --url http://localhost:8000 --payload request.json --generations 20 --token $TOKEN
+"""
+
+import json
+import time
+import asyncio
+import argparse
+import statistics
+
+import httpx
+
+
+def percentile(samples, pct):
+    """Return the pct-th percentile of a list of samples"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(label, samples):
+    """Print latency percentiles (ms) for a list of samples (s)"""
+    ms = [s * 1000 for s in samples]
+    print(f"{label}: n={len(ms)} "
+          f"p50={percentile(ms, 50):.1f}ms p95={percentile(ms, 95):.1f}ms "
+          f"p99={percentile(ms, 99):.1f}ms max={max(ms) if ms else 0:.1f}ms "
+          f"mean={statistics.mean(ms) if ms else 0:.1f}ms")
+
+
+async def probe_health(client, url, stop_event, interval):
+    """Poll /health until stop_event is set and collect latencies"""
+    latencies = []
+    while not stop_event.is_set():
+        start = time.perf_counter()
+        try:
+            response = await client.get(f"{url}/health")
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+        except Exception as e:
+            print(f"/health failed: {type(e).__name__}: {str(e)}")
+        await asyncio.sleep(interval)
+    return latencies
+
+
+async def generate(client, url, payload):
+    """Issue a single /generate-document request"""
+    start = time.perf_counter()
+    try:
+        response = await client.post(f"{url}/generate-document", json=payload)
+        return response.status_code, time.perf_counter() - start
+    except Exception as e:
+        print(f"/generate-document failed: {type(e).__name__}: {str(e)}")
+        return None, time.perf_counter() - start
+
+
+async def run(args):
+    with open(args.payload) as f:
+        payload = json.load(f)
+
+    timeout = httpx.Timeout(args.timeout)
+    limits = httpx.Limits(max_connections=args.generations + 10)
+    headers = {"Authorization": f"Bearer {args.token}"} if args.token else None
+    async with httpx.AsyncClient(timeout=timeout, limits=limits, headers=headers) as client:
+        # Baseline: /health with no generations in flight
+        stop_event = asyncio.Event()
+        probe = asyncio.create_task(probe_health(client, args.url, stop_event, args.interval))
+        await asyncio.sleep(args.baseline_seconds)
+        stop_event.set()
+        idle = await probe
+
+        # Loaded: /health while N generations are in flight
+        stop_event = asyncio.Event()
+        probe = asyncio.create_task(probe_health(client, args.url, stop_event, args.interval))
+        results = await asyncio.gather(*(generate(client, args.url, payload) for _ in range(args.generations)))
+        stop_event.set()
+        loaded = await probe
+
+    print("\n/health latency")
+    summarize("  idle  ", idle)
+    summarize("  loaded", loaded)
+
+    statuses = {}
+    for status, _ in results:
+        statuses[status] = statuses.get(status, 0) + 1
+    print(f"\n/generate-document x{args.generations}: statuses={statuses}")
+    summarize("  generation", [elapsed for _, elapsed in results])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search Wizard API load test")
+    parser.add_argument("--url", type=str, default="http://localhost:8000", help="Base URL of the API server")
+    parser.add_argument("--payload", type=str, required=True, help="JSON file with a /generate-document request body")
+    parser.add_argument("--generations", type=int, default=20, help="Number of concurrent generations")
+    parser.add_argument("--interval", type=float, default=0.1, help="Seconds between /health probes")
+    parser.add_argument("--baseline-seconds", type=float, default=5.0, help="Seconds of idle /health sampling")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Per-request timeout in seconds")
+    parser.add_argument("--token", type=str, default=None, help="Supabase access token to authenticate as")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
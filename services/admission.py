@@ -0,0 +1,131 @@
+"""
+Admission Control for Search Wizard
+Per-user and global concurrency limits with a bounded wait queue, shared across workers
+"""
+
+import os
+import time
+import uuid
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional
+from dotenv import load_dotenv
+
+from .cache_service import CacheService, get_cache
+from .logger import get_logger
+
+load_dotenv()
+
+logger = get_logger(__name__)
+
+class AdmissionRejected(Exception):
+    """The request could not be admitted; the client should retry later"""
+
+    def __init__(self, reason: str, retry_after: int):
+        self.reason = reason
+        self.retry_after = retry_after
+        super().__init__(reason)
+
+class AdmissionController:
+    """
+    Admits expensive requests within per-user and global concurrency limits.
+
+    A request takes one slot in the global slot set and one in its user's
+    set (see CacheService.acquire_slots), so the limits hold across every
+    worker sharing the Redis instance. When either set is full the request
+    joins a bounded wait queue and retries until a slot frees up or the queue
+    timeout passes. A full queue or a timed-out wait is rejected with a
+    Retry-After hint. Slots expire after ``slot_ttl`` in case a worker dies
+    holding them.
+    """
+
+    def __init__(self, cache: CacheService, global_limit: int = None, user_limit: int = None, queue_size: int = None,
+                 queue_timeout: float = None, slot_ttl: int = None, poll_interval: float = None, retry_after: int = None):
+        self.cache = cache
+        self.global_limit = global_limit or int(os.getenv("ADMISSION_GLOBAL_LIMIT", "32"))
+        self.user_limit = user_limit or int(os.getenv("ADMISSION_USER_LIMIT", "4"))
+        self.queue_size = queue_size or int(os.getenv("ADMISSION_QUEUE_SIZE", "64"))
+        self.queue_timeout = queue_timeout or float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "30"))
+        self.slot_ttl = slot_ttl or int(os.getenv("ADMISSION_SLOT_TTL", "900"))
+        self.poll_interval = poll_interval or float(os.getenv("ADMISSION_POLL_INTERVAL", "0.25"))
+        self.retry_after = retry_after or int(os.getenv("ADMISSION_RETRY_AFTER", "10"))
+        self.rejected = 0
+
+    def _limits(self, user_id: str) -> Dict[str, int]:
+        return {"admission:global": self.global_limit, f"admission:user:{user_id}": self.user_limit}
+
+    async def acquire(self, user_id: str, timeout: Optional[float] = None) -> str:
+        """
+        Wait for a slot for a user's request
+
+        Args:
+            user_id: Caller identity the per-user limit applies to
+            timeout: Longest wait in the queue (default: the queue timeout)
+
+        Returns:
+            Ticket to release the slot with
+
+        Raises:
+            AdmissionRejected: If the wait queue is full or the wait timed out
+        """
+        ticket = uuid.uuid4().hex
+        limits = self._limits(user_id)
+        timeout = self.queue_timeout if timeout is None else timeout
+        if await self.cache.acquire_slots(limits, ticket, self.slot_ttl):
+            return ticket
+
+        # Hold a queue slot while waiting so the number of waiters stays bounded
+        if not await self.cache.acquire_slots({"admission:queue": self.queue_size}, ticket, int(timeout) + 1):
+            self.rejected += 1
+            logger.warning("Admission queue full; rejecting request from %s", user_id)
+            raise AdmissionRejected("Too many requests are waiting; try again later", self.retry_after)
+
+        try:
+            started = time.monotonic()
+            while not await self.cache.acquire_slots(limits, ticket, self.slot_ttl):
+                if time.monotonic() - started >= timeout:
+                    self.rejected += 1
+                    logger.warning("Request from %s waited %.0fs without a slot; rejecting", user_id, timeout)
+                    raise AdmissionRejected("Server is busy; try again later", self.retry_after)
+                await asyncio.sleep(self.poll_interval)
+            logger.info("Admitted request from %s after %.2fs in queue", user_id, time.monotonic() - started)
+            return ticket
+        finally:
+            await self.cache.release_slots(["admission:queue"], ticket)
+
+    async def release(self, user_id: str, ticket: str):
+        """Give back a slot taken with acquire"""
+        await self.cache.release_slots(list(self._limits(user_id)), ticket)
+
+    @asynccontextmanager
+    async def admit(self, user_id: str, timeout: Optional[float] = None) -> AsyncIterator[str]:
+        """Hold a slot for the duration of the context"""
+        ticket = await self.acquire(user_id, timeout)
+        try:
+            yield ticket
+        finally:
+            await self.release(user_id, ticket)
+
+    async def get_stats(self, user_id: Optional[str] = None) -> Dict[str, int]:
+        """Current slot usage (and a user's, if given)"""
+        stats = {
+            "in_flight": await self.cache.count_slots("admission:global"),
+            "global_limit": self.global_limit,
+            "waiting": await self.cache.count_slots("admission:queue"),
+            "queue_size": self.queue_size,
+            "rejected": self.rejected
+        }
+        if user_id:
+            stats["user_in_flight"] = await self.cache.count_slots(f"admission:user:{user_id}")
+            stats["user_limit"] = self.user_limit
+        return stats
+
+# Global admission controller
+_admission_instance = None
+
+async def get_admission_controller() -> AdmissionController:
+    """Get global admission controller"""
+    global _admission_instance
+    if _admission_instance is None:
+        _admission_instance = AdmissionController(await get_cache())
+    return _admission_instance
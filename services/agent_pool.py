@@ -0,0 +1,88 @@
+"""
+Agent Pool for Search Wizard
+Pre-built, reusable agents borrowed per request instead of constructed per request
+"""
+
+import os
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+from dotenv import load_dotenv
+
+from .logger import get_logger
+
+load_dotenv()
+
+logger = get_logger(__name__)
+
+class AgentPool:
+    """
+    A fixed set of agents for one provider.
+
+    Agents are built once, so their provider clients (the native async
+    clients and their keep-alive connection pools) are reused across
+    requests. A request borrows an agent for the duration of its call and
+    awaits the provider on the event loop; only file extraction runs on the
+    blocking pool. Each agent serves one request at a time, so per-call
+    agent state is never interleaved between requests while the provider
+    clients are shared.
+    """
+
+    def __init__(self, provider: str, factory: Callable[[], Any], size: int = None):
+        self.provider = provider
+        self.size = size or int(os.getenv("AGENT_POOL_SIZE", "4"))
+        self._agents = [factory() for _ in range(self.size)]
+        self._idle: asyncio.Queue = asyncio.Queue()
+        for agent in self._agents:
+            self._idle.put_nowait(agent)
+        logger.info("Built %d %s agents", self.size, provider)
+
+    @asynccontextmanager
+    async def borrow(self) -> AsyncIterator[Any]:
+        """Borrow an agent, waiting if every agent is in use"""
+        agent = await self._idle.get()
+        try:
+            yield agent
+        finally:
+            self._idle.put_nowait(agent)
+
+    @property
+    def available(self) -> int:
+        """Number of idle agents"""
+        return self._idle.qsize()
+
+    async def aclose_all(self) -> None:
+        """Close the provider clients of every agent in the pool, borrowed or idle"""
+        for agent in self._agents:
+            try:
+                await agent.agent_wrapper.aclose()
+            except Exception as e:
+                logger.warning("Error closing %s agent: %s", self.provider, e)
+
+# Global pools, keyed by name (e.g. "structure")
+_pools: Dict[str, AgentPool] = {}
+
+def init_agent_pool(name: str, provider: str, factory: Callable[[], Any], size: int = None) -> AgentPool:
+    """
+    Build (or rebuild, when the provider changed) the global pool for a name
+
+    Args:
+        name: Pool name
+        provider: Provider the agents use
+        factory: Builds one agent
+        size: Number of agents (default AGENT_POOL_SIZE)
+    """
+    pool = _pools.get(name)
+    if pool is None or pool.provider != provider:
+        pool = _pools[name] = AgentPool(provider, factory, size)
+    return pool
+
+def get_agent_pool(name: str) -> Optional[AgentPool]:
+    """Get a global pool, or None if it was never initialised"""
+    return _pools.get(name)
+
+async def close_agent_pools() -> None:
+    """Close every global pool's agents (at shutdown)"""
+    while _pools:
+        _, pool = _pools.popitem()
+        await pool.aclose_all()
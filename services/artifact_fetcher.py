@@ -0,0 +1,212 @@
+"""
+Artifact Fetcher for Search Wizard
+Downloads and extracts company/role artifact content concurrently
+"""
+
+import os
+import time
+import asyncio
+import tempfile
+from dataclasses import dataclass
+from typing import Dict, Any, List, Optional
+
+import httpx
+from dotenv import load_dotenv
+
+from utils import extract_text_from_pdf
+from .deadline import ClientDisconnected, DeadlineExceeded
+from .executor import run_blocking
+from .supabase_service import get_supabase
+from .logger import get_logger
+
+load_dotenv()
+
+logger = get_logger(__name__)
+
+@dataclass
+class FetchedArtifact:
+    """
+    Resolved content for a single company or role artifact
+    """
+    artifact_type: str
+    name: str
+    content: str
+    content_type: str = ""
+    fetch_time: float = 0.0
+    error: Optional[str] = None
+
+
+def _looks_like_raw_pdf(text: str) -> bool:
+    """Check whether text still contains raw PDF structure markers"""
+    return 'trailer' in text and 'xref' in text and 'startxref' in text
+
+
+def _extract_raw_pdf_text(description: str) -> Optional[str]:
+    """Last-resort extraction of raw PDF content that was sent as a string"""
+    temp_file_path = None
+    try:
+        with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as temp_file:
+            temp_file.write(description.encode('utf-8', errors='ignore'))
+            temp_file_path = temp_file.name
+
+        import PyPDF2
+        with open(temp_file_path, 'rb') as f:
+            reader = PyPDF2.PdfReader(f)
+            extracted_text = ""
+            for page in reader.pages:
+                page_text = page.extract_text()
+                if page_text:
+                    extracted_text += page_text + "\n\n"
+
+        return extracted_text if extracted_text.strip() else None
+    except Exception as e:
+        logger.error("Error extracting text from PDF: %s", e)
+        return None
+    finally:
+        if temp_file_path:
+            try:
+                os.unlink(temp_file_path)
+            except OSError:
+                pass
+
+
+class ArtifactFetcher:
+    """
+    Fetches artifact content over the shared storage HTTP client.
+
+    Downloads run concurrently up to ``concurrency`` at a time. Results keep the
+    order of the input artifacts and a failure on one artifact never affects
+    the others; only the request running out of time (or its client leaving)
+    stops the fetch.
+    """
+
+    def __init__(self, concurrency: int = None):
+        self.concurrency = concurrency or int(os.getenv("ARTIFACT_FETCH_CONCURRENCY", "8"))
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+
+    async def _download(self, file_url: str) -> httpx.Response:
+        """Download a URL through the shared storage client, bounded by the semaphore"""
+        supabase = await get_supabase()
+        async with self._semaphore:
+            return await supabase.download(file_url)
+
+    async def _content_from_response(self, response: httpx.Response, name: str) -> str:
+        """Turn a downloaded response into text, extracting PDFs"""
+        content_type = response.headers.get('Content-Type', '')
+        if 'text' in content_type or 'json' in content_type or 'xml' in content_type:
+            return response.text
+
+        if 'pdf' in content_type:
+            logger.info("Processing PDF file: %s", name)
+            return await run_blocking("extraction", extract_text_from_pdf, response.content)
+
+        return f"[Binary content of type {content_type} - {len(response.content)} bytes]"
+
+    async def fetch_artifact(self, artifact: Dict[str, Any], artifact_type: str) -> FetchedArtifact:
+        """
+        Resolve the text content of a single artifact
+
+        Args:
+            artifact: Artifact payload from the frontend
+            artifact_type: "company" or "role"
+
+        Returns:
+            FetchedArtifact with the resolved content, or the error encountered
+
+        Raises:
+            DeadlineExceeded: If the request deadline passed
+            ClientDisconnected: If the client went away
+        """
+        start_time = time.time()
+        name = artifact.get("name", "")
+        description = artifact.get("description", "") or ""
+        content_type = ""
+        error = None
+
+        try:
+            # If description is empty or very short, try to fetch from file_url
+            if len(description) < 10:
+                file_url = artifact.get("file_url") or artifact.get("fileUrl")
+                file_path = artifact.get("file_path") or artifact.get("filePath")
+
+                if file_url:
+                    response = await self._download(file_url)
+                    if response.status_code == 200:
+                        content_type = response.headers.get('Content-Type', '')
+                        description = await self._content_from_response(response, name)
+                        logger.info("Fetched %s: %s chars (Content-Type: %s)", name, len(description), content_type)
+                    else:
+                        error = f"HTTP {response.status_code}"
+                        logger.error("Failed to fetch content for %s: %s, Response: %s", name, response.status_code, response.text[:100])
+                elif file_path:
+                    logger.info("Artifact has file_path but no direct URL: %s", file_path)
+
+            if len(description) < 10:
+                logger.warning("No substantial content found for artifact %s", name)
+
+            # Raw PDF content sent as text: re-download from the URL, then fall back to a temp file
+            if _looks_like_raw_pdf(description) and '\u0000' in description:
+                logger.info("Detected raw PDF content for %s, attempting to extract text properly", name)
+                file_url = artifact.get("file_url") or artifact.get("fileUrl")
+                if file_url:
+                    try:
+                        response = await self._download(file_url)
+                        if response.status_code == 200:
+                            extracted_text = await run_blocking("extraction", extract_text_from_pdf, response.content)
+                            if extracted_text and len(extracted_text) > 10:
+                                description = extracted_text
+                    except (DeadlineExceeded, ClientDisconnected):
+                        raise
+                    except Exception as url_error:
+                        logger.error("Error downloading and extracting from URL: %s", url_error)
+
+                if _looks_like_raw_pdf(description):
+                    extracted_text = await run_blocking("extraction", _extract_raw_pdf_text, description)
+                    if extracted_text:
+                        description = extracted_text
+                    else:
+                        logger.warning("PDF text extraction yielded empty content")
+
+        except (DeadlineExceeded, ClientDisconnected):
+            # The whole request is over, not just this artifact
+            raise
+        except Exception as e:
+            error = f"{type(e).__name__}: {str(e)}"
+            logger.error("Error fetching content for %s: %s", name, error)
+
+        return FetchedArtifact(
+            artifact_type=artifact_type,
+            name=name,
+            content=description,
+            content_type=content_type,
+            fetch_time=time.time() - start_time,
+            error=error
+        )
+
+    async def fetch_many(self, artifacts: List[Dict[str, Any]], artifact_type: str) -> List[FetchedArtifact]:
+        """Fetch a list of artifacts concurrently, preserving input order"""
+        return await asyncio.gather(*(self.fetch_artifact(artifact, artifact_type) for artifact in artifacts or []))
+
+    async def fetch_all(self, company_artifacts: List[Dict[str, Any]], role_artifacts: List[Dict[str, Any]]):
+        """
+        Fetch company and role artifacts together in a single concurrent stage
+
+        Returns:
+            Tuple of (company results, role results), each in input order
+        """
+        company_results, role_results = await asyncio.gather(
+            self.fetch_many(company_artifacts, "company"),
+            self.fetch_many(role_artifacts, "role")
+        )
+        return company_results, role_results
+
+
+# Global fetcher instance
+_fetcher_instance = None
+
+def get_artifact_fetcher() -> ArtifactFetcher:
+    """Get global artifact fetcher instance"""
+    global _fetcher_instance
+    if _fetcher_instance is None:
+        _fetcher_instance = ArtifactFetcher()
+    return _fetcher_instance
@@ -0,0 +1,79 @@
+"""
+Request Authentication for Search Wizard
+Verifies the Supabase access tokens the frontend sends, to identify the calling user
+"""
+
+import os
+import hmac
+import json
+import time
+import base64
+import hashlib
+from typing import Any, Dict, Optional
+from dotenv import load_dotenv
+
+from .logger import get_logger
+
+load_dotenv()
+
+logger = get_logger(__name__)
+
+def _b64decode(segment: str) -> bytes:
+    return base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4))
+
+def verify_access_token(token: str, secret: Optional[str] = None, audience: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Verify a Supabase access token (an HS256 JWT signed with the project's JWT secret)
+
+    Args:
+        token: The bearer token
+        secret: JWT secret (default SUPABASE_JWT_SECRET)
+        audience: Required "aud" claim (default SUPABASE_JWT_AUDIENCE, "authenticated")
+
+    Returns:
+        The token's claims, or None if no secret is configured or the token is
+        malformed, wrongly signed, expired or for another audience
+    """
+    secret = secret or os.getenv("SUPABASE_JWT_SECRET")
+    if not secret or not token:
+        return None
+    audience = audience or os.getenv("SUPABASE_JWT_AUDIENCE", "authenticated")
+    try:
+        header_segment, payload_segment, signature_segment = token.split(".")
+        header = json.loads(_b64decode(header_segment))
+        if header.get("alg") != "HS256":
+            return None
+        expected = hmac.new(secret.encode("utf-8"), f"{header_segment}.{payload_segment}".encode("ascii"), hashlib.sha256).digest()
+        if not hmac.compare_digest(expected, _b64decode(signature_segment)):
+            return None
+        claims = json.loads(_b64decode(payload_segment))
+        if not isinstance(claims, dict) or not claims.get("sub"):
+            return None
+        if claims.get("exp") is not None and float(claims["exp"]) <= time.time():
+            return None
+    except (ValueError, TypeError, UnicodeError) as e:
+        logger.debug("Rejecting malformed access token: %s", e)
+        return None
+
+    token_audience = claims.get("aud")
+    audiences = token_audience if isinstance(token_audience, list) else [token_audience]
+    if audience not in audiences:
+        return None
+    return claims
+
+def bearer_token(authorization: Optional[str]) -> Optional[str]:
+    """The token of an "Authorization: Bearer <token>" header, if that is what it holds"""
+    if not authorization:
+        return None
+    scheme, _, token = authorization.partition(" ")
+    return token.strip() if scheme.lower() == "bearer" and token.strip() else None
+
+def authenticated_user(authorization: Optional[str]) -> Optional[str]:
+    """Supabase user id of a request's verified bearer token, or None"""
+    claims = verify_access_token(bearer_token(authorization))
+    return str(claims["sub"]) if claims else None
+
+def is_internal_caller(token: Optional[str]) -> bool:
+    """Whether a request carries the shared INTERNAL_API_TOKEN (for webhooks and admin tools)"""
+    expected = os.getenv("INTERNAL_API_TOKEN")
+    return bool(expected and token) and hmac.compare_digest(expected.encode("utf-8"), token.encode("utf-8"))
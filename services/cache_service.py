@@ -5,13 +5,20 @@ Handles Redis-based caching for parsed documents and templates
 
 import os
 import json
+import time
+import uuid
 import asyncio
+from collections import OrderedDict
 from typing import Dict, Any, Optional, List
 import redis.asyncio as redis
 from dotenv import load_dotenv
 
+from .logger import get_logger
+
 load_dotenv()
 
+logger = get_logger(__name__)
+
 class CacheService:
     """
     Redis-based caching service for document parsing results
@@ -22,6 +29,16 @@ class CacheService:
         self.redis_client = None
         self.default_ttl = 7 * 24 * 3600  # 7 days
         self.template_ttl = 30 * 24 * 3600  # 30 days for templates
+        self.structure_registry_ttl = int(os.getenv("STRUCTURE_CACHE_TTL", "300"))  # 5 minutes
+        self.generated_document_ttl = int(os.getenv("GENERATED_DOCUMENT_CACHE_TTL", str(7 * 24 * 3600)))  # 7 days
+        self.generation_record_ttl = int(os.getenv("GENERATION_RECORD_TTL", str(30 * 24 * 3600)))  # 30 days
+        self._l1_cache = {}  # In-process L1: key -> (expires_at, value)
+        self._invalidation_channel = self._get_key("invalidate", "l1")
+        self._invalidation_task = None  # Drops L1 entries invalidated by any worker
+        self._memory_slots = {}  # Slot sets when Redis is unavailable: key -> {member: expires_at}
+        self._memory_cache = OrderedDict()  # LRU when Redis is unavailable: key -> (expires_at, value)
+        self._memory_counters = {}  # Counters when Redis is unavailable
+        self.memory_cache_max_items = int(os.getenv("MEMORY_CACHE_MAX_ITEMS", "500"))
         
     async def connect(self):
         """Initialize Redis connection"""
@@ -35,17 +52,20 @@ class CacheService:
             )
             # Test connection
             await self.redis_client.ping()
-            print("✅ Redis connection established")
+            logger.info("✅ Redis connection established")
+            self._invalidation_task = asyncio.create_task(self._listen_for_invalidations())
             return True
         except Exception as e:
-            print(f"❌ Redis connection failed: {str(e)}")
-            print("📝 Falling back to memory-only caching")
+            logger.error("❌ Redis connection failed: %s", e)
+            logger.warning("📝 Falling back to memory-only caching")
             self.redis_client = None
-            self._memory_cache = {}
             return False
     
     async def disconnect(self):
         """Close Redis connection"""
+        if self._invalidation_task:
+            self._invalidation_task.cancel()
+            self._invalidation_task = None
         if self.redis_client:
             await self.redis_client.close()
     
@@ -62,6 +82,24 @@ class CacheService:
         """Generate cache key with namespace"""
         return f"search_wizard:{key_type}:{identifier}"
     
+    def _memory_get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Get from the memory fallback, dropping the entry if it has expired"""
+        entry = self._memory_cache.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.time():
+            del self._memory_cache[key]
+            return None
+        self._memory_cache.move_to_end(key)
+        return entry[1]
+    
+    def _memory_set(self, key: str, value: Dict[str, Any], ttl: int) -> None:
+        """Store in the memory fallback, evicting the least recently used entries over the size bound"""
+        self._memory_cache[key] = (time.time() + ttl, value)
+        self._memory_cache.move_to_end(key)
+        while len(self._memory_cache) > self.memory_cache_max_items:
+            self._memory_cache.popitem(last=False)
+    
     async def get(self, key: str) -> Optional[Dict[str, Any]]:
         """Get value from cache"""
         try:
@@ -70,9 +108,9 @@ class CacheService:
                 return json.loads(cached) if cached else None
             else:
                 # Fallback to memory cache
-                return self._memory_cache.get(key)
+                return self._memory_get(key)
         except Exception as e:
-            print(f"Cache get error: {str(e)}")
+            logger.error("Cache get error: %s", e)
             return None
     
     async def set(self, key: str, value: Dict[str, Any], ttl: int = None) -> bool:
@@ -84,11 +122,11 @@ class CacheService:
                 await self.redis_client.setex(key, ttl, json.dumps(value))
                 return True
             else:
-                # Fallback to memory cache (no TTL in memory)
-                self._memory_cache[key] = value
+                # Fallback to memory cache (bounded LRU, same TTL)
+                self._memory_set(key, value, ttl)
                 return True
         except Exception as e:
-            print(f"Cache set error: {str(e)}")
+            logger.error("Cache set error: %s", e)
             return False
     
     async def delete(self, key: str) -> bool:
@@ -100,7 +138,7 @@ class CacheService:
             else:
                 return self._memory_cache.pop(key, None) is not None
         except Exception as e:
-            print(f"Cache delete error: {str(e)}")
+            logger.error("Cache delete error: %s", e)
             return False
     
     async def exists(self, key: str) -> bool:
@@ -109,9 +147,9 @@ class CacheService:
             if self.redis_client:
                 return await self.redis_client.exists(key) > 0
             else:
-                return key in self._memory_cache
+                return self._memory_get(key) is not None
         except Exception as e:
-            print(f"Cache exists error: {str(e)}")
+            logger.error("Cache exists error: %s", e)
             return False
     
     # Document parsing cache methods
@@ -172,6 +210,251 @@ class CacheService:
         key = self._get_key("structure", content_hash)
         return await self.set(key, analysis_data, ttl)
     
+    # In-process L1 invalidation, broadcast to every worker through Redis pub/sub
+    def _drop_l1(self, key: str = None, prefix: str = None) -> None:
+        if key:
+            self._l1_cache.pop(key, None)
+        if prefix:
+            for stale in [k for k in self._l1_cache if k.startswith(prefix)]:
+                del self._l1_cache[stale]
+    
+    async def _invalidate_l1(self, key: str = None, prefix: str = None) -> None:
+        """Drop L1 entries here and tell the other workers to drop them too"""
+        self._drop_l1(key, prefix)
+        if self.redis_client:
+            try:
+                await self.redis_client.publish(self._invalidation_channel, json.dumps({"key": key, "prefix": prefix}))
+            except Exception as e:
+                # Other workers fall back to the L1 TTL
+                logger.error("L1 invalidation publish error: %s", e)
+    
+    async def _listen_for_invalidations(self) -> None:
+        """Apply L1 invalidations published by other workers, resubscribing after errors"""
+        while self.redis_client:
+            pubsub = self.redis_client.pubsub()
+            try:
+                await pubsub.subscribe(self._invalidation_channel)
+                async for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        data = json.loads(message["data"])
+                        self._drop_l1(data.get("key"), data.get("prefix"))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Entries may be stale until this reconnects; clearing L1 bounds that
+                logger.error("L1 invalidation listener error: %s", e)
+                self._l1_cache.clear()
+                await asyncio.sleep(1)
+            finally:
+                try:
+                    await pubsub.close()
+                except Exception:
+                    pass
+    
+    # Structure registry cache methods (golden example structures by user and document type)
+    def _structure_registry_key(self, user_id: str, document_type: str) -> str:
+        return self._get_key("structure_registry", f"{user_id}:{document_type}")
+    
+    async def get_structure_registry(self, user_id: str, document_type: str) -> Optional[Dict[str, Any]]:
+        """Get cached structure and file_url for a golden example, checking the in-process L1 first"""
+        key = self._structure_registry_key(user_id, document_type)
+        now = time.time()
+        
+        entry = self._l1_cache.get(key)
+        if entry:
+            expires_at, value = entry
+            if expires_at > now:
+                return value
+            del self._l1_cache[key]
+        
+        value = await self.get(key)
+        # Check freshness on the entry itself so the L1 copy never outlives it
+        if value and value.get("cached_at", 0) + self.structure_registry_ttl > now:
+            self._l1_cache[key] = (value["cached_at"] + self.structure_registry_ttl, value)
+            return value
+        return None
+    
+    async def cache_structure_registry(self, user_id: str, document_type: str, structure: Dict[str, Any], file_url: str, ttl: int = None) -> bool:
+        """Cache a resolved golden example structure"""
+        key = self._structure_registry_key(user_id, document_type)
+        ttl = ttl or self.structure_registry_ttl
+        value = {
+            "structure": structure,
+            "file_url": file_url,
+            "cached_at": time.time()
+        }
+        self._l1_cache[key] = (value["cached_at"] + ttl, value)
+        return await self.set(key, value, ttl)
+    
+    async def invalidate_structure_registry(self, user_id: str, document_type: str = None) -> int:
+        """
+        Invalidate one cached structure, or all of a user's structures when document_type is None
+        
+        The L1 entries are dropped in every worker (via Redis pub/sub). Without
+        Redis there is only this worker's L1 to drop.
+        """
+        if document_type:
+            key = self._structure_registry_key(user_id, document_type)
+            await self._invalidate_l1(key=key)
+            return 1 if await self.delete(key) else 0
+        
+        await self._invalidate_l1(prefix=self._structure_registry_key(user_id, ""))
+        return await self.clear_cache(f"structure_registry:{user_id}:")
+    
+    # Generated document cache methods (content-addressed by generation inputs)
+    async def get_generated_document(self, digest: str) -> Optional[Dict[str, Any]]:
+        """Get a generated document by the digest of its inputs"""
+        key = self._get_key("generated_doc", digest)
+        return await self.get(key)
+    
+    async def cache_generated_document(self, digest: str, document: Dict[str, Any], ttl: int = None) -> bool:
+        """Cache a generated document under the digest of its inputs"""
+        key = self._get_key("generated_doc", digest)
+        ttl = ttl or self.generated_document_ttl
+        return await self.set(key, document, ttl)
+    
+    # Generation records (per-section HTML and provenance, for incremental regeneration)
+    async def get_generation(self, generation_id: str) -> Optional[Dict[str, Any]]:
+        """Get the record of a previous section-mode generation"""
+        key = self._get_key("generation", generation_id)
+        return await self.get(key)
+    
+    async def save_generation(self, generation_id: str, record: Dict[str, Any], ttl: int = None) -> bool:
+        """Store the record of a section-mode generation"""
+        key = self._get_key("generation", generation_id)
+        ttl = ttl or self.generation_record_ttl
+        return await self.set(key, record, ttl)
+    
+    # Distributed locks
+    async def acquire_lock(self, name: str, ttl: int = 300) -> Optional[str]:
+        """
+        Try to take a named lock shared by every worker
+
+        Without Redis there is only this process to coordinate with, so the
+        lock is always granted. Redis errors also grant the lock so a cache
+        outage never blocks work.
+
+        Args:
+            name: Lock name
+            ttl: Seconds after which the lock expires if never released
+
+        Returns:
+            Token to release the lock with, or None if another holder has it
+        """
+        token = uuid.uuid4().hex
+        try:
+            if self.redis_client:
+                acquired = await self.redis_client.set(self._get_key("lock", name), token, nx=True, ex=ttl)
+                return token if acquired else None
+            return token
+        except Exception as e:
+            logger.error("Lock acquire error: %s", e)
+            return token
+    
+    async def release_lock(self, name: str, token: str) -> bool:
+        """Release a lock if it is still held with the given token"""
+        try:
+            if self.redis_client:
+                # Compare-and-delete so an expired lock re-taken by someone else is left alone
+                script = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) else return 0 end"
+                return await self.redis_client.eval(script, 1, self._get_key("lock", name), token) > 0
+            return True
+        except Exception as e:
+            logger.error("Lock release error: %s", e)
+            return False
+    
+    async def lock_held(self, name: str) -> bool:
+        """Check whether a named lock is currently held"""
+        try:
+            if self.redis_client:
+                return await self.redis_client.exists(self._get_key("lock", name)) > 0
+            return False
+        except Exception as e:
+            logger.error("Lock check error: %s", e)
+            return False
+    
+    # Counted slots (shared concurrency limits)
+    _ACQUIRE_SLOTS_SCRIPT = """
+    local now = tonumber(ARGV[1])
+    for i, key in ipairs(KEYS) do
+        redis.call('zremrangebyscore', key, '-inf', now)
+        if redis.call('zcard', key) >= tonumber(ARGV[3 + i]) then
+            return 0
+        end
+    end
+    for i, key in ipairs(KEYS) do
+        redis.call('zadd', key, ARGV[2], ARGV[3])
+        redis.call('expireat', key, math.ceil(tonumber(ARGV[2])))
+    end
+    return 1
+    """
+    
+    async def acquire_slots(self, limits: Dict[str, int], member: str, ttl: int = 300) -> bool:
+        """
+        Atomically take a slot in every named slot set, or in none of them
+
+        Slots live in sorted sets scored by expiry time, so slots held by a
+        worker that died are reclaimed after ttl. Without Redis the slots are
+        counted in process memory. Redis errors grant the slots so a cache
+        outage never blocks work.
+
+        Args:
+            limits: Slot set name -> maximum number of holders
+            member: Unique id of the holder
+            ttl: Seconds after which an unreleased slot expires
+
+        Returns:
+            True if a slot was taken in every set
+        """
+        now = time.time()
+        keys = [self._get_key("slots", name) for name in limits]
+        try:
+            if self.redis_client:
+                acquired = await self.redis_client.eval(
+                    self._ACQUIRE_SLOTS_SCRIPT, len(keys), *keys, now, now + ttl, member, *limits.values()
+                )
+                return acquired == 1
+            
+            slot_sets = [self._memory_slots.setdefault(key, {}) for key in keys]
+            for slots in slot_sets:
+                for expired in [m for m, expires in slots.items() if expires <= now]:
+                    del slots[expired]
+            if any(len(slots) >= limit for slots, limit in zip(slot_sets, limits.values())):
+                return False
+            for slots in slot_sets:
+                slots[member] = now + ttl
+            return True
+        except Exception as e:
+            logger.error("Slot acquire error: %s", e)
+            return True
+    
+    async def release_slots(self, names: List[str], member: str) -> None:
+        """Give back the slots a member holds in the named slot sets"""
+        keys = [self._get_key("slots", name) for name in names]
+        try:
+            if self.redis_client:
+                pipeline = self.redis_client.pipeline()
+                for key in keys:
+                    pipeline.zrem(key, member)
+                await pipeline.execute()
+            else:
+                for key in keys:
+                    self._memory_slots.get(key, {}).pop(member, None)
+        except Exception as e:
+            logger.error("Slot release error: %s", e)
+    
+    async def count_slots(self, name: str) -> int:
+        """Number of unexpired slots held in a slot set"""
+        key = self._get_key("slots", name)
+        now = time.time()
+        try:
+            if self.redis_client:
+                return await self.redis_client.zcount(key, now, '+inf')
+            return sum(1 for expires in self._memory_slots.get(key, {}).values() if expires > now)
+        except Exception as e:
+            logger.error("Slot count error: %s", e)
+            return 0
+    
     # Analytics and monitoring
     async def increment_counter(self, counter_name: str, by: int = 1) -> int:
         """Increment a counter (for usage analytics)"""
@@ -182,11 +465,11 @@ class CacheService:
             else:
                 # Memory fallback
                 counter_key = f"counter_{counter_name}"
-                current = self._memory_cache.get(counter_key, 0)
-                self._memory_cache[counter_key] = current + by
+                current = self._memory_counters.get(counter_key, 0)
+                self._memory_counters[counter_key] = current + by
                 return current + by
         except Exception as e:
-            print(f"Counter increment error: {str(e)}")
+            logger.error("Counter increment error: %s", e)
             return 0
     
     async def get_counter(self, counter_name: str) -> int:
@@ -198,9 +481,9 @@ class CacheService:
                 return int(value) if value else 0
             else:
                 counter_key = f"counter_{counter_name}"
-                return self._memory_cache.get(counter_key, 0)
+                return self._memory_counters.get(counter_key, 0)
         except Exception as e:
-            print(f"Counter get error: {str(e)}")
+            logger.error("Counter get error: %s", e)
             return 0
     
     async def track_parser_usage(self, parser_type: str, success: bool = True) -> None:
@@ -248,6 +531,7 @@ class CacheService:
                     "type": "memory",
                     "connected": True,
                     "cached_items": len(self._memory_cache),
+                    "max_items": self.memory_cache_max_items,
                     "memory_usage": "unknown"
                 }
         except Exception as e:
@@ -276,16 +560,20 @@ class CacheService:
             else:
                 # Memory cache
                 if pattern:
-                    keys_to_delete = [k for k in self._memory_cache.keys() if pattern in k]
-                    for key in keys_to_delete:
-                        del self._memory_cache[key]
-                    return len(keys_to_delete)
+                    count = 0
+                    for store in (self._memory_cache, self._memory_counters):
+                        keys_to_delete = [k for k in store.keys() if pattern in k]
+                        for key in keys_to_delete:
+                            del store[key]
+                        count += len(keys_to_delete)
+                    return count
                 else:
-                    count = len(self._memory_cache)
+                    count = len(self._memory_cache) + len(self._memory_counters)
                     self._memory_cache.clear()
+                    self._memory_counters.clear()
                     return count
         except Exception as e:
-            print(f"Cache clear error: {str(e)}")
+            logger.error("Cache clear error: %s", e)
             return 0
 
 # Global cache instance
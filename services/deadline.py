@@ -0,0 +1,139 @@
+"""
+Request Deadlines for Search Wizard
+Per-request time budgets propagated to downloads, queries and provider calls
+"""
+
+import os
+import time
+import asyncio
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Iterator, Optional
+from dotenv import load_dotenv
+
+from .logger import get_logger
+
+load_dotenv()
+
+logger = get_logger(__name__)
+
+# Header a client can send to shorten (or, up to the maximum, extend) its deadline
+DEADLINE_HEADER = "X-Request-Timeout"
+
+# Default deadlines per endpoint in seconds (overridable via environment variables)
+DEFAULT_DEADLINES = {
+    "generate-document": ("GENERATE_DOCUMENT_DEADLINE", 300),
+    "generate-documents": ("GENERATE_DOCUMENTS_DEADLINE", 600),
+    "analyze-structure": ("ANALYZE_STRUCTURE_DEADLINE", 180),
+    "analyze-file": ("ANALYZE_FILE_DEADLINE", 180),
+}
+DEFAULT_DEADLINE = 300
+
+_deadline: contextvars.ContextVar = contextvars.ContextVar("request_deadline", default=None)
+
+class DeadlineExceeded(Exception):
+    """The request ran past its deadline"""
+    pass
+
+class ClientDisconnected(Exception):
+    """The client went away before the response was ready"""
+    pass
+
+def endpoint_deadline(endpoint: str, override: Optional[float] = None) -> float:
+    """
+    Deadline in seconds for a request to an endpoint
+
+    Args:
+        endpoint: Endpoint name
+        override: Seconds requested by the client (capped at REQUEST_DEADLINE_MAX)
+
+    Returns:
+        Seconds the request may run for
+    """
+    env_var, default = DEFAULT_DEADLINES.get(endpoint, (None, DEFAULT_DEADLINE))
+    seconds = float(os.getenv(env_var, str(default))) if env_var else float(default)
+    if override is not None and override > 0:
+        seconds = min(float(override), float(os.getenv("REQUEST_DEADLINE_MAX", "900")))
+    return seconds
+
+@contextmanager
+def deadline_scope(seconds: float) -> Iterator[float]:
+    """
+    Set the deadline for everything run in this context
+
+    The deadline is stored in a context variable, so tasks created inside the
+    scope and blocking calls run through the executor inherit it.
+    """
+    expires = time.monotonic() + seconds
+    token = _deadline.set(expires)
+    try:
+        yield expires
+    finally:
+        try:
+            _deadline.reset(token)
+        except ValueError:
+            # Closed from another context (e.g. an abandoned async generator being finalized)
+            pass
+
+def remaining() -> Optional[float]:
+    """Seconds left before the current deadline, or None if there is none"""
+    expires = _deadline.get()
+    return None if expires is None else expires - time.monotonic()
+
+def check():
+    """Raise DeadlineExceeded if the current deadline has passed"""
+    left = remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceeded("Request deadline exceeded")
+
+def current_timeout(default: float) -> float:
+    """
+    Timeout for one I/O call: the default, shortened to the time left
+
+    Raises:
+        DeadlineExceeded: If the deadline has already passed
+    """
+    left = remaining()
+    if left is None:
+        return default
+    if left <= 0:
+        raise DeadlineExceeded("Request deadline exceeded")
+    return min(default, left)
+
+async def run_with_deadline(awaitable: Awaitable[Any]) -> Any:
+    """Await something, cancelling it when the current deadline passes"""
+    left = remaining()
+    if left is None:
+        return await awaitable
+    try:
+        return await asyncio.wait_for(awaitable, max(left, 0))
+    except asyncio.TimeoutError:
+        raise DeadlineExceeded("Request deadline exceeded")
+
+async def run_until_disconnect(is_disconnected: Callable[[], Awaitable[bool]], awaitable: Awaitable[Any],
+                               poll_interval: float = None) -> Any:
+    """
+    Await something under the current deadline, cancelling it if the client disconnects
+
+    Args:
+        is_disconnected: Coroutine function reporting whether the client has gone
+            (e.g. starlette's Request.is_disconnected)
+        awaitable: The work to run
+        poll_interval: Seconds between disconnect checks
+
+    Raises:
+        ClientDisconnected: If the client went away first
+        DeadlineExceeded: If the deadline passed first
+    """
+    poll_interval = poll_interval or float(os.getenv("DISCONNECT_POLL_INTERVAL", "1.0"))
+    task = asyncio.ensure_future(run_with_deadline(awaitable))
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll_interval)
+            if done:
+                return task.result()
+            if await is_disconnected():
+                logger.info("Client disconnected; cancelling its work")
+                raise ClientDisconnected("Client disconnected")
+    finally:
+        task.cancel()
@@ -0,0 +1,121 @@
+"""
+Debug Capture Service for Search Wizard
+Samples generation prompts to a bounded ring of compressed files for debugging
+"""
+
+import os
+import gzip
+import uuid
+import random
+import asyncio
+import datetime
+import threading
+from typing import Optional, Set
+from dotenv import load_dotenv
+
+from .executor import run_blocking
+from .logger import get_logger
+
+load_dotenv()
+
+logger = get_logger(__name__)
+
+DEFAULT_CAPTURE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'debug')
+
+class DebugCapture:
+    """
+    Sampled, bounded capture of debug payloads
+
+    A fraction of requests (``sample_rate``) are captured, plus any request
+    that forces capture. Files are gzip-compressed and written on the
+    blocking pool so the event loop never touches the disk. After each
+    write the oldest captures are removed until the directory holds at most
+    ``max_files`` files and ``max_bytes`` bytes.
+    """
+
+    def __init__(self, directory: str = None, sample_rate: float = None, max_files: int = None, max_bytes: int = None):
+        self.directory = directory or os.getenv("DEBUG_CAPTURE_DIR", DEFAULT_CAPTURE_DIR)
+        self.sample_rate = sample_rate if sample_rate is not None else float(os.getenv("DEBUG_CAPTURE_SAMPLE_RATE", "0.01"))
+        self.max_files = max_files or int(os.getenv("DEBUG_CAPTURE_MAX_FILES", "50"))
+        self.max_bytes = max_bytes or int(os.getenv("DEBUG_CAPTURE_MAX_BYTES", str(50 * 1024 * 1024)))
+        self._lock = threading.Lock()
+        self._pending: Set[asyncio.Task] = set()
+
+    def should_capture(self, force: bool = False) -> bool:
+        """Decide whether to capture this request"""
+        return force or (self.sample_rate > 0 and random.random() < self.sample_rate)
+
+    def capture(self, content: str, label: str = "prompt", force: bool = False) -> Optional[str]:
+        """
+        Capture a payload in the background if this request is sampled
+
+        Args:
+            content: Text to capture
+            label: File name prefix
+            force: Capture regardless of the sampling rate
+
+        Returns:
+            Path the capture will be written to, or None if not sampled
+        """
+        if not self.should_capture(force):
+            return None
+
+        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        path = os.path.join(self.directory, f"{label}_{timestamp}_{uuid.uuid4().hex[:8]}.txt.gz")
+        task = asyncio.create_task(run_blocking("debug-capture", self._write, path, content))
+        self._pending.add(task)
+        task.add_done_callback(self._write_done)
+        return path
+
+    def _write_done(self, task: asyncio.Task):
+        self._pending.discard(task)
+        if not task.cancelled() and task.exception():
+            logger.warning("Debug capture failed: %s", task.exception())
+
+    def _write(self, path: str, content: str):
+        """Write a compressed capture and trim the ring (runs on the blocking pool)"""
+        os.makedirs(self.directory, exist_ok=True)
+        with gzip.open(path, 'wt', encoding='utf-8') as f:
+            f.write(content)
+        self._prune()
+        logger.info("Saved debug capture to: %s", path)
+
+    def _prune(self):
+        """Remove the oldest captures until the ring is within its bounds"""
+        with self._lock:
+            entries = []
+            for name in os.listdir(self.directory):
+                path = os.path.join(self.directory, name)
+                if name.endswith('.gz') and os.path.isfile(path):
+                    stat = os.stat(path)
+                    entries.append((stat.st_mtime, stat.st_size, path))
+            entries.sort()
+
+            total = sum(size for _, size, _ in entries)
+            while entries and (len(entries) > self.max_files or total > self.max_bytes):
+                _, size, path = entries.pop(0)
+                try:
+                    os.remove(path)
+                    total -= size
+                except OSError:
+                    pass
+
+    async def flush(self):
+        """Wait for in-progress writes to finish"""
+        if self._pending:
+            await asyncio.gather(*self._pending, return_exceptions=True)
+
+# Global capture instance
+_capture_instance = None
+
+def get_debug_capture() -> DebugCapture:
+    """Get global debug capture instance"""
+    global _capture_instance
+    if _capture_instance is None:
+        _capture_instance = DebugCapture()
+    return _capture_instance
+
+async def flush_debug_capture():
+    """Wait for the global debug capture's pending writes"""
+    if _capture_instance is not None:
+        await _capture_instance.flush()
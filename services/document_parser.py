@@ -14,11 +14,14 @@ import time
 
 from .llamaparse_client import LlamaParseClient, LlamaParseError
 from .cache_service import CacheService
+from .logger import get_logger
 from ..utils import extract_text_from_pdf, extract_text_from_docx, process_url_content
 from dotenv import load_dotenv
 
 load_dotenv()
 
+logger = get_logger(__name__)
+
 class ParserType(Enum):
     """Available parser types"""
     LLAMAPARSE_PREMIUM = "llamaparse_premium"
@@ -285,7 +288,7 @@ class DocumentParserService:
             
         except Exception as e:
             # Fallback on error
-            print(f"Parsing failed with {parser_type}, falling back: {str(e)}")
+            logger.warning("Parsing failed with %s, falling back: %s", parser_type, e)
             return await self._parse_with_fallback(file_path, ParserType.LEGACY_PYMUPDF)
     
     async def _parse_with_llamaparse(self, file_path: str, parser_type: ParserType, document_type: str = None) -> ParsedDocument:
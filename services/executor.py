@@ -0,0 +1,171 @@
+"""
+Blocking Execution Service for Search Wizard
+Runs blocking provider calls and document extraction off the event loop
+"""
+
+import os
+import asyncio
+import functools
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Per-endpoint concurrency caps (overridable via environment variables)
+DEFAULT_LIMITS = {
+    "generate-document": ("GENERATE_DOCUMENT_CONCURRENCY", 16),
+    "generate-section": ("GENERATE_SECTION_CONCURRENCY", 16),
+    "analyze-structure": ("ANALYZE_STRUCTURE_CONCURRENCY", 4),
+    "analyze-file": ("ANALYZE_FILE_CONCURRENCY", 4),
+    "process-content": ("PROCESS_CONTENT_CONCURRENCY", 8),
+    "extraction": ("EXTRACTION_CONCURRENCY", 8),
+    "supabase": ("SUPABASE_QUERY_CONCURRENCY", 8),
+    "upload-spool": ("UPLOAD_SPOOL_CONCURRENCY", 16),
+    "llm": ("LLM_BLOCKING_CONCURRENCY", 8),
+}
+
+class BlockingExecutor:
+    """
+    Bounded thread pool for blocking work.
+
+    Every call is tagged with an endpoint name; each endpoint has its own
+    semaphore so a burst on one endpoint cannot take every pool thread.
+    Callers queue on the semaphore without holding a thread. Calls run in a
+    copy of the caller's context, so context variables such as the request
+    deadline are visible in the worker thread.
+    """
+
+    def __init__(self, max_workers: int = None, limits: Dict[str, int] = None):
+        self.max_workers = max_workers or int(os.getenv("BLOCKING_POOL_SIZE", "32"))
+        self.limits = {
+            endpoint: int(os.getenv(env_var, str(default)))
+            for endpoint, (env_var, default) in DEFAULT_LIMITS.items()
+        }
+        if limits:
+            self.limits.update(limits)
+        self.default_limit = int(os.getenv("DEFAULT_ENDPOINT_CONCURRENCY", "4"))
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="blocking")
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._in_flight: Dict[str, int] = {}
+
+    def _semaphore(self, endpoint: str) -> asyncio.Semaphore:
+        """Get (or create) the semaphore for an endpoint"""
+        if endpoint not in self._semaphores:
+            self._semaphores[endpoint] = asyncio.Semaphore(self.limits.get(endpoint, self.default_limit))
+        return self._semaphores[endpoint]
+
+    async def run(self, endpoint: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Run a blocking callable on the pool, bounded by the endpoint's cap
+
+        Args:
+            endpoint: Name of the endpoint (or stage) the work belongs to
+            fn: Blocking callable
+            *args, **kwargs: Arguments passed to the callable
+
+        Returns:
+            The callable's return value
+        """
+        async with self._semaphore(endpoint):
+            self._in_flight[endpoint] = self._in_flight.get(endpoint, 0) + 1
+            try:
+                loop = asyncio.get_running_loop()
+                context = contextvars.copy_context()
+                return await loop.run_in_executor(self._pool, functools.partial(context.run, fn, *args, **kwargs))
+            finally:
+                self._in_flight[endpoint] -= 1
+
+    async def iterate(self, endpoint: str, fn: Callable[..., Any], *args, **kwargs) -> AsyncIterator[Any]:
+        """
+        Consume a blocking iterator on the pool and yield its items asynchronously
+
+        The endpoint's slot is held until the iterator is exhausted or the
+        consumer stops early, in which case the worker thread stops at the
+        next item.
+
+        Args:
+            endpoint: Name of the endpoint (or stage) the work belongs to
+            fn: Callable returning a blocking iterator (e.g. a generator function)
+            *args, **kwargs: Arguments passed to the callable
+
+        Yields:
+            Items produced by the iterator, in order
+        """
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        finished = object()
+        stop = threading.Event()
+
+        def produce():
+            error = None
+            try:
+                for item in fn(*args, **kwargs):
+                    if stop.is_set():
+                        break
+                    loop.call_soon_threadsafe(queue.put_nowait, (item, None))
+            except Exception as e:
+                error = e
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, (finished, error))
+            except RuntimeError:
+                # Event loop already closed; nobody is listening anymore
+                pass
+
+        async with self._semaphore(endpoint):
+            self._in_flight[endpoint] = self._in_flight.get(endpoint, 0) + 1
+            loop.run_in_executor(self._pool, contextvars.copy_context().run, produce)
+            try:
+                while True:
+                    item, error = await queue.get()
+                    if item is finished:
+                        if error is not None:
+                            raise error
+                        break
+                    yield item
+            finally:
+                stop.set()
+                self._in_flight[endpoint] -= 1
+
+    def get_stats(self) -> Dict[str, Dict[str, int]]:
+        """Get current in-flight counts and caps per endpoint"""
+        return {
+            endpoint: {
+                "in_flight": self._in_flight.get(endpoint, 0),
+                "limit": self.limits.get(endpoint, self.default_limit)
+            }
+            for endpoint in set(self.limits) | set(self._in_flight)
+        }
+
+    def shutdown(self, wait: bool = False):
+        """Shut down the thread pool"""
+        self._pool.shutdown(wait=wait)
+
+# Global executor instance
+_executor_instance = None
+
+def get_executor() -> BlockingExecutor:
+    """Get global blocking executor instance"""
+    global _executor_instance
+    if _executor_instance is None:
+        _executor_instance = BlockingExecutor()
+    return _executor_instance
+
+def shutdown_executor():
+    """Shut down the global blocking executor"""
+    global _executor_instance
+    if _executor_instance is not None:
+        _executor_instance.shutdown()
+        _executor_instance = None
+
+# Convenience functions
+async def run_blocking(endpoint: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run a blocking callable on the global executor (convenience function)"""
+    return await get_executor().run(endpoint, fn, *args, **kwargs)
+
+async def iterate_blocking(endpoint: str, fn: Callable[..., Any], *args, **kwargs) -> AsyncIterator[Any]:
+    """Consume a blocking iterator on the global executor (convenience function)"""
+    async for item in get_executor().iterate(endpoint, fn, *args, **kwargs):
+        yield item
@@ -0,0 +1,218 @@
+"""
+Job Queue Service for Search Wizard
+Runs long document generations in the background on a bounded worker pool
+"""
+
+import os
+import time
+import uuid
+import asyncio
+import datetime
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict, Optional
+from dotenv import load_dotenv
+
+from .cache_service import CacheService
+from .logger import get_logger
+
+load_dotenv()
+
+logger = get_logger(__name__)
+
+class JobStatus:
+    """Job lifecycle states"""
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+class Job:
+    """
+    A queued unit of work and its recorded progress
+    """
+
+    def __init__(self, queue: 'JobQueue', record: Dict[str, Any]):
+        self.queue = queue
+        self.record = record
+
+    @property
+    def id(self) -> str:
+        return self.record["id"]
+
+    @property
+    def payload(self) -> Dict[str, Any]:
+        return self.record.get("payload", {})
+
+    @asynccontextmanager
+    async def stage(self, name: str):
+        """Record the start time and duration of a named stage"""
+        self.record["current_stage"] = name
+        self.record["stages"][name] = {"status": JobStatus.RUNNING, "started_at": time.time()}
+        await self.queue.save(self)
+        started = time.time()
+        try:
+            yield
+        except Exception:
+            self.record["stages"][name].update({"status": JobStatus.FAILED, "elapsed": round(time.time() - started, 3)})
+            raise
+        self.record["stages"][name].update({"status": JobStatus.COMPLETED, "elapsed": round(time.time() - started, 3)})
+        await self.queue.save(self)
+
+    def to_public_dict(self) -> Dict[str, Any]:
+        """Job record without the submitted payload"""
+        return {k: v for k, v in self.record.items() if k != "payload"}
+
+JobHandler = Callable[[Job], Awaitable[Dict[str, Any]]]
+
+class JobQueue:
+    """
+    Background job queue drained by a fixed pool of workers
+
+    Job records live in the cache (Redis, or the in-memory fallback). Job ids
+    are queued on a Redis list when Redis is connected so any worker process
+    can pick them up; otherwise an in-process asyncio queue is used. The worker
+    count caps how many jobs run at once in this process.
+    """
+
+    def __init__(self, cache: CacheService, workers: int = None, job_ttl: int = None):
+        self.cache = cache
+        self.worker_count = workers or int(os.getenv("GENERATION_WORKERS", "4"))
+        self.job_ttl = job_ttl or int(os.getenv("JOB_TTL", str(24 * 3600)))
+        self.queue_key = cache._get_key("jobs", "queue")
+        self._local_queue: asyncio.Queue = asyncio.Queue()
+        self._handlers: Dict[str, JobHandler] = {}
+        self._workers = []
+
+    def _job_key(self, job_id: str) -> str:
+        return self.cache._get_key("job", job_id)
+
+    def register(self, kind: str, handler: JobHandler):
+        """Register the coroutine that runs jobs of a given kind"""
+        self._handlers[kind] = handler
+
+    async def submit(self, kind: str, payload: Dict[str, Any]) -> Job:
+        """
+        Queue a new job
+
+        Args:
+            kind: Registered job kind
+            payload: JSON-serialisable job input
+
+        Returns:
+            The queued Job
+        """
+        if kind not in self._handlers:
+            raise ValueError(f"No handler registered for job kind: {kind}")
+
+        job = Job(self, {
+            "id": str(uuid.uuid4()),
+            "kind": kind,
+            "status": JobStatus.QUEUED,
+            "created_at": datetime.datetime.now().isoformat(),
+            "started_at": None,
+            "finished_at": None,
+            "current_stage": None,
+            "stages": {},
+            "result": None,
+            "error": None,
+            "payload": payload
+        })
+        await self.save(job)
+
+        if self.cache.redis_client:
+            await self.cache.redis_client.rpush(self.queue_key, job.id)
+        else:
+            await self._local_queue.put(job.id)
+
+        return job
+
+    async def save(self, job: Job) -> bool:
+        """Persist a job record"""
+        return await self.cache.set(self._job_key(job.id), job.record, self.job_ttl)
+
+    async def get_job(self, job_id: str) -> Optional[Job]:
+        """Load a job by id"""
+        record = await self.cache.get(self._job_key(job_id))
+        return Job(self, record) if record else None
+
+    async def _next_job_id(self) -> str:
+        """Wait for the next queued job id"""
+        if self.cache.redis_client:
+            while True:
+                # Short blocking pop so we stay under the client's socket timeout
+                item = await self.cache.redis_client.blpop(self.queue_key, timeout=1)
+                if item:
+                    return item[1]
+        return await self._local_queue.get()
+
+    async def _run_job(self, job: Job):
+        """Run a single job and record its outcome"""
+        handler = self._handlers.get(job.record.get("kind"))
+        job.record["status"] = JobStatus.RUNNING
+        job.record["started_at"] = datetime.datetime.now().isoformat()
+        await self.save(job)
+
+        try:
+            if handler is None:
+                raise ValueError(f"No handler registered for job kind: {job.record.get('kind')}")
+            job.record["result"] = await handler(job)
+            job.record["status"] = JobStatus.COMPLETED
+        except Exception as e:
+            logger.error("Job %s failed: %s: %s", job.id, type(e).__name__, e)
+            job.record["status"] = JobStatus.FAILED
+            job.record["error"] = getattr(e, "detail", None) or str(e)
+        finally:
+            job.record["current_stage"] = None
+            job.record["finished_at"] = datetime.datetime.now().isoformat()
+            await self.save(job)
+
+    async def _worker(self, worker_id: int):
+        """Drain the queue until cancelled"""
+        while True:
+            try:
+                job_id = await self._next_job_id()
+                job = await self.get_job(job_id)
+                if job is None:
+                    logger.warning("Worker %s: job %s expired before it could run", worker_id, job_id)
+                    continue
+                await self._run_job(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception("Worker %s error: %s", worker_id, e)
+                await asyncio.sleep(1)
+
+    async def start(self):
+        """Start the worker pool"""
+        if self._workers:
+            return
+        self._workers = [asyncio.create_task(self._worker(i)) for i in range(self.worker_count)]
+        logger.info("Started %s generation workers", self.worker_count)
+
+    async def stop(self):
+        """Cancel all workers"""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+# Global job queue instance
+_job_queue_instance = None
+
+def get_job_queue() -> Optional[JobQueue]:
+    """Get global job queue instance (None until init_job_queue has run)"""
+    return _job_queue_instance
+
+async def init_job_queue(cache: CacheService) -> JobQueue:
+    """Create the global job queue on top of a connected cache"""
+    global _job_queue_instance
+    if _job_queue_instance is None:
+        _job_queue_instance = JobQueue(cache)
+    return _job_queue_instance
+
+async def shutdown_job_queue():
+    """Stop the global job queue's workers"""
+    global _job_queue_instance
+    if _job_queue_instance is not None:
+        await _job_queue_instance.stop()
+        _job_queue_instance = None
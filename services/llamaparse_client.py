@@ -11,8 +11,12 @@ import json
 from dotenv import load_dotenv
 from llama_parse import LlamaParse
 
+from .logger import get_logger
+
 load_dotenv()
 
+logger = get_logger(__name__)
+
 class LlamaParseError(Exception):
     """Custom exception for LlamaParse API errors"""
     pass
@@ -114,7 +118,7 @@ class LlamaParseClient:
             )
             
             # Parse the document
-            print(f"🔄 Parsing document with LlamaParse ({parsing_mode} mode)...")
+            logger.info("🔄 Parsing document with LlamaParse (%s mode)...", parsing_mode)
             documents = self.parser.load_data(file_path)
             
             parsing_time = time.time() - start_time
@@ -122,7 +126,7 @@ class LlamaParseClient:
             # Convert to our format
             result = self._convert_llamaparse_documents(documents, file_path, parsing_mode, parsing_time)
             
-            print(f"✅ LlamaParse completed in {parsing_time:.2f}s")
+            logger.info("✅ LlamaParse completed in %.2fs", parsing_time)
             return result
             
         except Exception as e:
@@ -0,0 +1,111 @@
+"""
+Logging for Search Wizard
+Level-gated structured logging with lazily formatted payload summaries
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+from typing import Any, Callable
+from dotenv import load_dotenv
+
+load_dotenv()
+
+TEXT_FORMAT = '%(asctime)s - %(levelname)s - %(name)s - %(message)s'
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per log line, for log pipelines that index fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(record.created)),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+_configured = False
+
+def configure_logging():
+    """
+    Configure the root logger from the environment (once per process)
+
+    LOG_LEVEL sets the level (default INFO) and LOG_FORMAT=json switches to
+    one JSON object per line.
+    """
+    global _configured
+    if _configured:
+        return
+    _configured = True
+
+    level = getattr(logging, os.getenv("LOG_LEVEL", "INFO").upper(), logging.INFO)
+    formatter = JSONFormatter() if os.getenv("LOG_FORMAT", "text").lower() == "json" else logging.Formatter(TEXT_FORMAT)
+
+    root = logging.getLogger()
+    if not root.handlers:
+        root.addHandler(logging.StreamHandler())
+    for handler in root.handlers:
+        handler.setFormatter(formatter)
+    root.setLevel(level)
+
+def get_logger(name: str) -> logging.Logger:
+    """Get a logger, configuring logging on first use"""
+    configure_logging()
+    return logging.getLogger(name)
+
+def _digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:12]
+
+def describe(value: Any) -> str:
+    """
+    Summarize a payload by size, hash and item count instead of its contents
+
+    Args:
+        value: String, bytes, dict, list or any JSON-serialisable value
+
+    Returns:
+        Short description such as "dict(5 keys, 10234 chars, sha256:1a2b3c4d5e6f)"
+    """
+    if value is None:
+        return "None"
+    if isinstance(value, bytes):
+        return f"bytes({len(value)} bytes, sha256:{_digest(value)})"
+    if isinstance(value, str):
+        return f"str({len(value)} chars, sha256:{_digest(value.encode('utf-8', 'replace'))})"
+
+    serialized = json.dumps(value, sort_keys=True, default=str)
+    if isinstance(value, dict):
+        count = f"{len(value)} keys, "
+    elif isinstance(value, (list, tuple)):
+        count = f"{len(value)} items, "
+    else:
+        count = ""
+    return f"{type(value).__name__}({count}{len(serialized)} chars, sha256:{_digest(serialized.encode('utf-8', 'replace'))})"
+
+class _Lazy:
+    """Defers formatting until a log record is actually emitted"""
+
+    def __init__(self, render: Callable[[Any], str], value: Any):
+        self.render = render
+        self.value = value
+
+    def __str__(self) -> str:
+        return self.render(self.value)
+
+    __repr__ = __str__
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, indent=2, default=str)
+
+def summarize(value: Any) -> _Lazy:
+    """Log argument that renders as describe(value), computed only if the record is emitted"""
+    return _Lazy(describe, value)
+
+def lazy_json(value: Any) -> _Lazy:
+    """Log argument that renders as indented JSON, computed only if the record is emitted"""
+    return _Lazy(_dumps, value)
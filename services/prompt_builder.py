@@ -0,0 +1,200 @@
+"""
+Prompt Builder for Search Wizard
+Assembles generation prompts within a per-provider token budget
+"""
+
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set
+from dotenv import load_dotenv
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+load_dotenv()
+
+# Input token budgets per provider (overridable via environment variables).
+# Each leaves headroom under the model's context window for the response.
+DEFAULT_BUDGETS = {
+    "anthropic": ("PROMPT_TOKEN_BUDGET_ANTHROPIC", 150000),
+    "openai": ("PROMPT_TOKEN_BUDGET_OPENAI", 150000),
+    "gemini": ("PROMPT_TOKEN_BUDGET_GEMINI", 800000),
+    "deepseek": ("PROMPT_TOKEN_BUDGET_DEEPSEEK", 50000),
+}
+DEFAULT_BUDGET = 100000
+
+# Section headers for knowledge base content, by artifact type
+KNOWLEDGE_HEADERS = {
+    "company": "\n--- COMPANY INFORMATION ---\n",
+    "role": "\n--- ROLE INFORMATION ---\n"
+}
+
+# Words too common in section names to say anything about relevance
+STOPWORDS = {"and", "the", "for", "with", "our", "your", "from", "this", "that", "section", "overview"}
+
+_encoding = None
+
+def estimate_tokens(text: str) -> int:
+    """
+    Count the tokens in a piece of text
+
+    Uses tiktoken when it is installed; otherwise estimates four characters
+    per token, which is close for English prose on every supported provider.
+    """
+    global _encoding
+    if not text:
+        return 0
+    if tiktoken is not None:
+        if _encoding is None:
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        return len(_encoding.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+def get_token_budget(provider: str) -> int:
+    """Get the prompt token budget for a provider"""
+    override = os.getenv("PROMPT_TOKEN_BUDGET")
+    if override:
+        return int(override)
+    env_var, default = DEFAULT_BUDGETS.get(provider, (None, DEFAULT_BUDGET))
+    return int(os.getenv(env_var, str(default))) if env_var else default
+
+def _terms(text: str) -> Set[str]:
+    """Lowercase words of three or more letters, minus stopwords"""
+    return {word for word in re.findall(r"[a-z]{3,}", text.lower()) if word not in STOPWORDS}
+
+def section_terms(structure: Any) -> Set[str]:
+    """
+    Collect the words in the structure's section and subsection names
+
+    Args:
+        structure: Parsed structure template
+
+    Returns:
+        Set of terms used to rank knowledge base chunks
+    """
+    terms = set()
+
+    def visit(sections):
+        for section in sections or []:
+            if not isinstance(section, dict):
+                continue
+            terms.update(_terms(str(section.get("name") or section.get("title") or "")))
+            visit(section.get("subsections"))
+
+    if isinstance(structure, dict):
+        visit(structure.get("sections"))
+    return terms
+
+def relevance(text: str, terms: Set[str]) -> float:
+    """Fraction of the section terms that appear in a chunk"""
+    if not terms:
+        return 0.0
+    return len(_terms(text) & terms) / len(terms)
+
+@dataclass
+class PromptSegment:
+    """
+    A piece of the prompt and what it costs
+    """
+    name: str
+    text: str
+    required: bool = True
+    score: float = 0.0
+    tokens: int = 0
+    prefix: bool = False
+
+@dataclass
+class PromptBuild:
+    """
+    A built prompt and a report of what went into it
+
+    ``prefix`` holds the stable leading blocks (instructions, structure) that
+    providers can cache across requests; ``prompt`` is the volatile rest.
+    """
+    prompt: str
+    budget: int
+    tokens: int
+    included: List[str] = field(default_factory=list)
+    dropped: List[Dict[str, Any]] = field(default_factory=list)
+    over_budget: bool = False
+    prefix: List[str] = field(default_factory=list)
+
+    @property
+    def text(self) -> str:
+        """The whole prompt, prefix included"""
+        return "".join(self.prefix) + self.prompt
+
+    def report(self) -> Dict[str, Any]:
+        """Summary suitable for logging and response metadata"""
+        return {
+            "prompt_tokens": self.tokens,
+            "prefix_tokens": sum(estimate_tokens(block) for block in self.prefix),
+            "token_budget": self.budget,
+            "chunks_included": len(self.included),
+            "chunks_dropped": len(self.dropped),
+            "dropped": self.dropped,
+            "over_budget": self.over_budget
+        }
+
+class PromptBuilder:
+    """
+    Builds a prompt from ordered segments within a token budget.
+
+    Required segments (instructions, structure, user requirements) are always
+    kept. Optional segments (knowledge base chunks) are admitted in order of
+    relevance score until the budget is spent, then the kept segments are
+    joined in the order they were added so the prompt layout does not change.
+
+    Prefix segments are identical across requests and must be added before
+    any other segment; each becomes a separate block of PromptBuild.prefix so
+    the agent can send it as a cacheable system prompt.
+    """
+
+    def __init__(self, provider: str, budget: int = None):
+        self.provider = provider
+        self.budget = budget or get_token_budget(provider)
+        self.segments: List[PromptSegment] = []
+
+    def add(self, name: str, text: str, required: bool = True, score: float = 0.0, prefix: bool = False):
+        """
+        Append a segment to the prompt
+
+        Args:
+            name: Label used in the report (the chunk name for knowledge base items)
+            text: Segment text
+            required: Whether the segment must be kept regardless of budget
+            score: Relevance used to rank optional segments
+            prefix: Whether the segment is part of the stable, cacheable prefix
+        """
+        if prefix and (not required or any(not segment.prefix for segment in self.segments)):
+            raise ValueError(f"Prefix segment {name} must be required and added before other segments")
+        self.segments.append(PromptSegment(name, text, required, score, estimate_tokens(text), prefix))
+
+    def build(self) -> PromptBuild:
+        """Select segments within the budget and join them"""
+        used = sum(segment.tokens for segment in self.segments if segment.required)
+        keep = {i for i, segment in enumerate(self.segments) if segment.required}
+        optional = [i for i, segment in enumerate(self.segments) if not segment.required]
+
+        # Highest relevance first; earlier segments win ties
+        dropped = []
+        for i in sorted(optional, key=lambda i: (-self.segments[i].score, i)):
+            segment = self.segments[i]
+            if used + segment.tokens <= self.budget:
+                keep.add(i)
+                used += segment.tokens
+            else:
+                dropped.append({"name": segment.name, "tokens": segment.tokens, "score": round(segment.score, 3)})
+
+        return PromptBuild(
+            prompt="".join(segment.text for i, segment in enumerate(self.segments) if i in keep and not segment.prefix),
+            budget=self.budget,
+            tokens=used,
+            included=[self.segments[i].name for i in sorted(keep) if not self.segments[i].required],
+            dropped=dropped,
+            over_budget=used > self.budget,
+            prefix=[segment.text for segment in self.segments if segment.prefix]
+        )
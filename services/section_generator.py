@@ -0,0 +1,511 @@
+"""
+Section Generator for Search Wizard
+Generates a document section by section in parallel and stitches the HTML together
+"""
+
+import os
+import re
+import json
+import time
+import asyncio
+import difflib
+import hashlib
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from dotenv import load_dotenv
+
+from .prompt_builder import KNOWLEDGE_HEADERS, PromptBuilder, PromptBuild, _terms, estimate_tokens, get_token_budget, relevance, section_terms
+from .logger import get_logger
+
+load_dotenv()
+
+logger = get_logger(__name__)
+
+# Shared vocabulary between the shell's stylesheet and every section fragment
+SECTION_CLASSES = """- sw-section: wrapper for one top-level section
+- sw-section-title: the section heading (h2)
+- sw-subsection / sw-subsection-title: nested subsections and their headings (h3)
+- sw-lead: an introductory paragraph
+- sw-callout: a highlighted callout box
+- sw-table: a data table
+- sw-list: a styled list
+- sw-columns: a multi-column layout container
+- sw-image-placeholder: a placeholder box for an image (include a short caption)"""
+
+BODY_PLACEHOLDER = '<main id="sw-document"></main>'
+
+SHELL_INDEX = -1
+
+def content_digest(value: Any) -> str:
+    """Short stable hash of a string or JSON-serialisable value"""
+    text = value if isinstance(value, str) else json.dumps(value, sort_keys=True, default=str)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+def structure_sections(structure: Any) -> List[Dict[str, Any]]:
+    """Top-level sections of a structure template, in order"""
+    if not isinstance(structure, dict):
+        return []
+    return [section for section in structure.get("sections") or [] if isinstance(section, dict)]
+
+def section_name(section: Dict[str, Any], index: int) -> str:
+    """Display name of a section"""
+    return str(section.get("name") or section.get("title") or f"Section {index + 1}")
+
+def document_context(structure: Dict[str, Any]) -> Dict[str, Any]:
+    """Document-level parts of the structure (everything except the sections) plus an outline"""
+    context = {key: value for key, value in structure.items() if key != "sections"}
+    context["outline"] = [section_name(section, i) for i, section in enumerate(structure_sections(structure))]
+    return context
+
+def strip_code_fences(text: str) -> str:
+    """Remove a surrounding markdown code fence that models sometimes add"""
+    text = text.strip()
+    match = re.match(r"^```[a-zA-Z]*\s*\n(.*?)\n?```$", text, re.DOTALL)
+    return match.group(1).strip() if match else text
+
+def stitch_document(shell_html: str, section_htmls: List[str]) -> str:
+    """
+    Insert section fragments into the document shell, in order
+
+    The fragments go inside the shell's ``<main id="sw-document">`` element,
+    or before ``</body>`` if the model dropped it.
+    """
+    body = "\n".join(section_htmls)
+    match = re.search(r'(<main[^>]*id=["\']sw-document["\'][^>]*>)(.*?)(</main>)', shell_html, re.DOTALL | re.IGNORECASE)
+    if match:
+        return shell_html[:match.end(1)] + "\n" + body + "\n" + shell_html[match.start(3):]
+    close_body = shell_html.lower().rfind("</body>")
+    if close_body != -1:
+        return shell_html[:close_body] + body + "\n" + shell_html[close_body:]
+    return shell_html + "\n" + body
+
+@dataclass
+class SectionResult:
+    """
+    Generated HTML for one section (or the shell) and how it was produced
+    """
+    index: int
+    name: str
+    html: str
+    elapsed: float
+    prompt: Dict[str, Any] = field(default_factory=dict)
+    included: List[str] = field(default_factory=list)
+    provenance: Dict[str, Any] = field(default_factory=dict)
+    reused: bool = False
+
+    def report(self) -> Dict[str, Any]:
+        """Summary suitable for response metadata"""
+        return {
+            "index": self.index,
+            "name": self.name,
+            "reused": self.reused,
+            "elapsed": round(self.elapsed, 3),
+            "html_chars": len(self.html),
+            "prompt_tokens": self.prompt.get("prompt_tokens"),
+            "chunks_included": len(self.included),
+            "chunks_dropped": self.prompt.get("chunks_dropped")
+        }
+
+@dataclass
+class SectionPlan:
+    """
+    A section's prompt and the inputs it depends on
+    """
+    index: int
+    name: str
+    build: PromptBuild
+    provenance: Dict[str, Any]
+
+class SectionGenerator:
+    """
+    Generates the structure's top-level sections as independent, concurrent LLM calls.
+
+    Every call shares a compact common context (document-level structure,
+    section outline and user requirements); each section prompt carries its own
+    part of the structure and only the knowledge base chunks relevant to it
+    (those matching its section and subsection names, or the best few when
+    none match), within a small per-section knowledge budget. A separate, small call produces the
+    document shell (head, stylesheet and title block) against a shared class
+    vocabulary, so fragments generated independently render consistently.
+    Wall time approaches that of the slowest section rather than the sum.
+
+    ``generate`` is called with each prompt's volatile part and its stable
+    prefix blocks (the common context), which providers cache across the
+    shell and every section.
+    """
+
+    def __init__(self, provider: str, generate: Callable[[str, List[str]], Awaitable[str]], concurrency: int = None, budget: int = None,
+                 knowledge_budget: int = None, min_chunks: int = None):
+        self.provider = provider
+        self.generate = generate
+        self.concurrency = concurrency or int(os.getenv("SECTION_GENERATION_CONCURRENCY", "4"))
+        self.budget = budget or min(get_token_budget(provider), int(os.getenv("SECTION_PROMPT_TOKEN_BUDGET", "30000")))
+        self.knowledge_budget = knowledge_budget or int(os.getenv("SECTION_KNOWLEDGE_TOKEN_BUDGET", "4000"))
+        self.min_chunks = min_chunks if min_chunks is not None else int(os.getenv("SECTION_KNOWLEDGE_MIN_CHUNKS", "2"))
+
+    def _common_context(self, document_type: str, structure: Dict[str, Any]) -> str:
+        return f"""## Core Role
+You are a professional document writer creating one part of a high-quality {document_type} document.
+The document is being written section by section in parallel, so write ONLY the part you are asked for.
+
+## Document-level structure (design system, tone and outline shared by every section)
+{json.dumps(document_context(structure), indent=2)}
+
+## Shared HTML class vocabulary
+{SECTION_CLASSES}
+"""
+
+    def build_shell_prompt(self, document_type: str, structure: Dict[str, Any], user_requirements: str = "") -> PromptBuild:
+        """Prompt for the document shell: head, stylesheet and title block"""
+        builder = PromptBuilder(self.provider, self.budget)
+        builder.add("common_context", self._common_context(document_type, structure), prefix=True)
+        if user_requirements:
+            builder.add("user_requirements", f"\nUSER REQUIREMENTS:\n{user_requirements}\n")
+        builder.add("shell_instructions", f"""
+## Your task: the document shell
+1. Output a complete HTML5 document with a <head> (meta charset and viewport tags, a <title>)
+2. Include ONE <style> block implementing the design system above for every class in the shared class vocabulary, plus print styles
+3. In <body>, add the document's title block, followed by exactly this empty element: {BODY_PLACEHOLDER}
+4. Do NOT write any section content; the sections are inserted into that element afterwards
+5. Your output should be ONLY the HTML with no explanations or commentary""")
+        return builder.build()
+
+    def select_chunks(self, section: Dict[str, Any], chunks: Dict[str, List[Dict[str, Any]]]) -> Tuple[Dict[str, List[Tuple[Dict[str, Any], float]]], List[Dict[str, Any]]]:
+        """
+        Pick the knowledge base chunks relevant to one section
+
+        Chunks are ranked by relevance to the section's own names. Those that
+        match (score > 0) are taken, plus the top min_chunks regardless of
+        score so a section with unusual names still gets some facts, highest
+        score first until knowledge_budget tokens are used.
+
+        Args:
+            section: The section's part of the structure
+            chunks: Artifact type -> matched knowledge base chunks
+
+        Returns:
+            Tuple of (artifact type -> selected (chunk, score) pairs in their
+            original order, report entries for the chunks left out)
+        """
+        terms = section_terms({"sections": [section]})
+        ranked = [
+            (artifact_type, item, relevance(f"{item['name']} {item['content']}", terms), estimate_tokens(f"\n{item['name']}:\n{item['content']}\n"))
+            for artifact_type, items in chunks.items() for item in items
+        ]
+        selected, used = set(), 0
+        for rank, i in enumerate(sorted(range(len(ranked)), key=lambda i: (-ranked[i][2], i))):
+            score, tokens = ranked[i][2], ranked[i][3]
+            if (score > 0 or rank < self.min_chunks) and used + tokens <= self.knowledge_budget:
+                selected.add(i)
+                used += tokens
+
+        picked: Dict[str, List[Tuple[Dict[str, Any], float]]] = {}
+        skipped = []
+        for i, (artifact_type, item, score, tokens) in enumerate(ranked):
+            if i in selected:
+                picked.setdefault(artifact_type, []).append((item, score))
+            else:
+                skipped.append({"name": item["name"], "tokens": tokens, "score": round(score, 3)})
+        return picked, skipped
+
+    def build_section_prompt(self, document_type: str, structure: Dict[str, Any], index: int, section: Dict[str, Any],
+                             chunks: Dict[str, List[Dict[str, Any]]], user_requirements: str = "") -> PromptBuild:
+        """
+        Prompt for one section, with only the knowledge base chunks relevant to it
+
+        Args:
+            document_type: Document type being generated
+            structure: Full structure template
+            index: Position of the section in the structure
+            section: The section's part of the structure
+            chunks: Artifact type -> matched knowledge base chunks
+            user_requirements: User requirements for the document
+
+        Returns:
+            PromptBuild for the section
+        """
+        name = section_name(section, index)
+        total = len(structure_sections(structure))
+        selected, skipped = self.select_chunks(section, chunks)
+
+        builder = PromptBuilder(self.provider, self.budget)
+        builder.add("common_context", self._common_context(document_type, structure), prefix=True)
+        builder.add("section_structure", f"""
+## Your task: section {index + 1} of {total} - "{name}"
+Follow this part of the structure template exactly:
+{json.dumps(section, indent=2)}
+
+KNOWLEDGE BASE CONTENT:
+""")
+        for artifact_type, items in selected.items():
+            builder.add(f"{artifact_type}_header", KNOWLEDGE_HEADERS[artifact_type])
+            for item, score in items:
+                builder.add(item["name"], f"\n{item['name']}:\n{item['content']}\n", required=False, score=score)
+        if user_requirements:
+            builder.add("user_requirements", f"\nUSER REQUIREMENTS:\n{user_requirements}\n")
+        builder.add("final_instructions", f"""
+IMPORTANT FINAL INSTRUCTIONS:
+1. Output ONLY a single <section class="sw-section" data-section-index="{index}"> element for "{name}" - no <html>, <head>, <style> or <body>
+2. Start with <h2 class="sw-section-title">{name}</h2> and include every subsection defined for this section
+3. Use ONLY classes from the shared class vocabulary; no inline <style> blocks
+4. Use FACTUAL information from the COMPANY and ROLE sections of the knowledge base; do NOT invent company names, roles, or other facts
+5. Address the user requirements that apply to this section
+6. Include image placeholders where the structure calls for them
+7. Your output should be ONLY the HTML fragment with no explanations or commentary""")
+        build = builder.build()
+        build.dropped.extend(skipped)
+        return build
+
+    def plan(self, document_type: str, structure: Dict[str, Any], chunks: Dict[str, List[Dict[str, Any]]],
+             user_requirements: str = "") -> List[SectionPlan]:
+        """
+        Build every section's prompt and record what it depends on
+
+        A section depends only on the chunks selected for its prompt (see
+        select_chunks), so editing an artifact invalidates just the sections
+        it is relevant to.
+
+        Returns:
+            SectionPlan per section, in structure order
+        """
+        contents = {item["name"]: item["content"] for items in chunks.values() for item in items}
+        plans = []
+        for index, section in enumerate(structure_sections(structure)):
+            build = self.build_section_prompt(document_type, structure, index, section, chunks, user_requirements)
+            plans.append(SectionPlan(
+                index=index,
+                name=section_name(section, index),
+                build=build,
+                provenance={
+                    "context": content_digest(document_context(structure)),
+                    "section": content_digest(section),
+                    "chunks": {name: content_digest(contents.get(name, "")) for name in build.included}
+                }
+            ))
+        return plans
+
+    async def _timed(self, semaphore: asyncio.Semaphore, index: int, name: str, build: PromptBuild,
+                     provenance: Optional[Dict[str, Any]] = None) -> SectionResult:
+        async with semaphore:
+            started = time.time()
+            html = strip_code_fences(await self.generate(build.prompt, build.prefix))
+        return SectionResult(
+            index=index,
+            name=name,
+            html=html,
+            elapsed=time.time() - started,
+            prompt=build.report(),
+            included=build.included,
+            provenance=provenance or {}
+        )
+
+    async def iterate(self, document_type: str, structure: Dict[str, Any], chunks: Dict[str, List[Dict[str, Any]]],
+                      user_requirements: str = "", plans: Optional[List[SectionPlan]] = None,
+                      include_shell: bool = True) -> AsyncIterator[SectionResult]:
+        """
+        Generate the shell and sections concurrently, yielding each as it completes
+
+        Args:
+            document_type: Document type being generated
+            structure: Full structure template
+            chunks: Artifact type -> matched knowledge base chunks
+            user_requirements: User requirements for the document
+            plans: Generate only these section plans (default: every section)
+            include_shell: Whether to generate the document shell (index SHELL_INDEX)
+
+        Yields:
+            SectionResult for the shell and each section, in completion order
+        """
+        if plans is None:
+            plans = self.plan(document_type, structure, chunks, user_requirements)
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        tasks = []
+        if include_shell:
+            tasks.append(asyncio.create_task(self._timed(
+                semaphore, SHELL_INDEX, "shell", self.build_shell_prompt(document_type, structure, user_requirements),
+                provenance={"context": content_digest(document_context(structure))}
+            )))
+        for plan in plans:
+            tasks.append(asyncio.create_task(self._timed(semaphore, plan.index, plan.name, plan.build, plan.provenance)))
+
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                result = await next_done
+                logger.info("Generated %s in %.2fs (%d chars)", "shell" if result.index == SHELL_INDEX else f"section {result.index + 1} '{result.name}'", result.elapsed, len(result.html))
+                yield result
+        finally:
+            # A failed section (or a departed consumer) stops the rest
+            for task in tasks:
+                task.cancel()
+
+    async def generate_document(self, document_type: str, structure: Dict[str, Any], chunks: Dict[str, List[Dict[str, Any]]],
+                                user_requirements: str = "") -> Tuple[str, List[SectionResult]]:
+        """
+        Generate every section and stitch the document together
+
+        Returns:
+            Tuple of (stitched HTML, section results in structure order with the shell first)
+        """
+        results = [result async for result in self.iterate(document_type, structure, chunks, user_requirements)]
+        return assemble(results)
+
+    async def regenerate(self, previous: Dict[str, Any], document_type: str, structure: Dict[str, Any],
+                         chunks: Dict[str, List[Dict[str, Any]]], user_requirements: str = "") -> Tuple[str, List[SectionResult], Dict[str, Any]]:
+        """
+        Regenerate only the sections whose inputs changed since a previous generation
+
+        Args:
+            previous: Generation record from generation_record()
+            document_type: Document type being generated
+            structure: Full structure template
+            chunks: Artifact type -> matched knowledge base chunks
+            user_requirements: User requirements for the document
+
+        Returns:
+            Tuple of (stitched HTML, section results with the shell first, report of
+            which sections were regenerated and why)
+        """
+        plans = self.plan(document_type, structure, chunks, user_requirements)
+        reasons, regenerate_shell = changed_sections(previous, plans, structure, user_requirements)
+        logger.info("Incremental regeneration: %d of %d sections changed%s", len(reasons), len(plans), ", plus shell" if regenerate_shell else "")
+
+        results = [result async for result in self.iterate(
+            document_type, structure, chunks, user_requirements,
+            plans=[plan for plan in plans if plan.index in reasons],
+            include_shell=regenerate_shell
+        )]
+
+        # Reuse the previous HTML for everything that did not change
+        previous_sections = {item["index"]: item for item in previous.get("sections", [])}
+        if not regenerate_shell:
+            results.append(SectionResult(SHELL_INDEX, "shell", previous["shell"]["html"], 0.0, provenance=previous["shell"]["provenance"], reused=True))
+        for plan in plans:
+            if plan.index not in reasons:
+                item = previous_sections[plan.index]
+                results.append(SectionResult(plan.index, plan.name, item["html"], 0.0, provenance=item["provenance"], reused=True))
+
+        html, results = assemble(results)
+        report = {
+            "previous_generation_id": previous.get("generation_id"),
+            "regenerated": [{"index": index, "name": plans[index].name, "reason": reason} for index, reason in sorted(reasons.items())],
+            "reused": [plan.name for plan in plans if plan.index not in reasons],
+            "shell_regenerated": regenerate_shell
+        }
+        return html, results, report
+
+def assemble(results: List[SectionResult]) -> Tuple[str, List[SectionResult]]:
+    """Order results by structure position and stitch the sections into the shell"""
+    results = sorted(results, key=lambda result: result.index)
+    return stitch_document(results[0].html, [result.html for result in results[1:]]), results
+
+def requirement_change_terms(previous: str, current: str) -> Set[str]:
+    """Terms in the requirement lines that were added or removed"""
+    previous_lines = [line.strip() for line in (previous or "").splitlines() if line.strip()]
+    current_lines = [line.strip() for line in (current or "").splitlines() if line.strip()]
+    changed = [line[2:] for line in difflib.ndiff(previous_lines, current_lines) if line[:2] in ("+ ", "- ")]
+    return _terms(" ".join(changed))
+
+def changed_chunks(previous: Dict[str, str], current: Dict[str, str]) -> List[str]:
+    """Names of the chunks added, removed or edited between two provenance chunk digests"""
+    return sorted(name for name in set(previous) | set(current) if previous.get(name) != current.get(name))
+
+def changed_sections(previous: Dict[str, Any], plans: List[SectionPlan], structure: Dict[str, Any],
+                     user_requirements: str) -> Tuple[Dict[int, str], bool]:
+    """
+    Decide which sections depend on inputs that changed since a previous generation
+
+    A section is regenerated when its part of the structure changed, when the
+    knowledge base chunks relevant to it were added, removed or edited (other
+    chunks are not part of its provenance), or when
+    changed requirement lines mention its section or subsection names. If the
+    document-level structure changed, or requirement changes mention no section
+    at all, everything (including the shell) is regenerated.
+
+    Returns:
+        Tuple of (section index -> reason, whether to regenerate the shell)
+    """
+    previous_sections = {item["index"]: item for item in previous.get("sections", [])}
+    context = content_digest(document_context(structure))
+    if previous.get("shell", {}).get("provenance", {}).get("context") != context:
+        return {plan.index: "document structure changed" for plan in plans}, True
+
+    change_terms = requirement_change_terms(previous.get("user_requirements", ""), user_requirements)
+    section_terms_by_index = {plan.index: section_terms({"sections": [structure_sections(structure)[plan.index]]}) for plan in plans}
+    if change_terms and not any(change_terms & terms for terms in section_terms_by_index.values()):
+        return {plan.index: "requirements changed" for plan in plans}, True
+
+    reasons = {}
+    for plan in plans:
+        item = previous_sections.get(plan.index)
+        if item is None or item.get("name") != plan.name:
+            reasons[plan.index] = "new section"
+        elif item["provenance"].get("section") != plan.provenance["section"]:
+            reasons[plan.index] = "section structure changed"
+        elif item["provenance"].get("chunks") != plan.provenance["chunks"]:
+            reasons[plan.index] = "artifacts changed: " + ", ".join(changed_chunks(item["provenance"].get("chunks") or {}, plan.provenance["chunks"]))
+        elif change_terms & section_terms_by_index[plan.index]:
+            reasons[plan.index] = "requirements changed"
+    return reasons, False
+
+def generation_record(generation_id: str, document_type: str, user_requirements: str, results: List[SectionResult]) -> Dict[str, Any]:
+    """
+    Per-section provenance record of a section-mode generation, for later incremental regeneration
+
+    Args:
+        generation_id: Id returned to the client
+        document_type: Document type generated
+        user_requirements: User requirements the document was generated from
+        results: Section results in structure order with the shell first
+    """
+    shell, sections = results[0], results[1:]
+    return {
+        "generation_id": generation_id,
+        "document_type": document_type,
+        "user_requirements": user_requirements,
+        "shell": {"html": shell.html, "provenance": shell.provenance},
+        "sections": [
+            {"index": section.index, "name": section.name, "html": section.html, "provenance": section.provenance}
+            for section in sections
+        ]
+    }
+
+if __name__ == "__main__":
+    # Simulated 8-section role spec: each call sleeps in proportion to its section's size
+    import random
+
+    structure = {
+        "document_title": "Role Specification",
+        "design_system": {"color_palette": {"primary": "#1a2b3c"}},
+        "sections": [{"name": f"Section {i + 1}", "purpose": "x" * random.randint(200, 800)} for i in range(8)]
+    }
+    chunks = {"company": [{"name": "Company Overview", "content": "Founded in 1999. " * 50}]}
+
+    async def fake_generate(prompt: str, system: List[str]) -> str:
+        await asyncio.sleep(len(prompt) / 20000)
+        if "the document shell" in prompt:
+            return f"<html><head><style></style></head><body><h1>Title</h1>{BODY_PLACEHOLDER}</body></html>"
+        index = re.search(r'data-section-index="(\d+)"', prompt).group(1)
+        return f'```html\n<section class="sw-section" data-section-index="{index}"></section>\n```'
+
+    async def main():
+        generator = SectionGenerator("openai", fake_generate, concurrency=8)
+        started = time.time()
+        html, results = await generator.generate_document("Role Spec", structure, chunks)
+        wall = time.time() - started
+        assert [r.index for r in results] == list(range(SHELL_INDEX, 8)), "sections out of order"
+        assert html.index('data-section-index="0"') < html.index('data-section-index="7"') < html.index("</main>")
+        print(f"Sum of section times:    {sum(r.elapsed for r in results):.2f}s")
+        print(f"Longest single section:  {max(r.elapsed for r in results):.2f}s")
+        print(f"Parallel wall time:      {wall:.2f}s")
+
+        # Edit one section's purpose: only that section should be regenerated
+        previous = generation_record("demo", "Role Spec", "", results)
+        structure["sections"][3]["purpose"] = "y" * 400
+        started = time.time()
+        html, results, report = await generator.regenerate(previous, "Role Spec", structure, chunks)
+        assert [item["index"] for item in report["regenerated"]] == [3] and not report["shell_regenerated"]
+        assert html.index('data-section-index="0"') < html.index('data-section-index="7"')
+        print(f"Incremental wall time:   {time.time() - started:.2f}s ({len(report['reused'])} sections reused)")
+
+    asyncio.run(main())
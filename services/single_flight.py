@@ -0,0 +1,150 @@
+"""
+Single-Flight Service for Search Wizard
+Coalesces concurrent identical requests so the work runs once
+"""
+
+import os
+import json
+import time
+import asyncio
+import hashlib
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict
+from dotenv import load_dotenv
+
+from .cache_service import CacheService, get_cache
+from .deadline import deadline_scope
+from .logger import get_logger
+
+load_dotenv()
+
+logger = get_logger(__name__)
+
+def request_digest(kind: str, payload: Any) -> str:
+    """
+    Canonical hash of a request payload
+
+    Keys are sorted so logically identical payloads hash the same regardless
+    of field order.
+
+    Args:
+        kind: Request kind (e.g. the endpoint name)
+        payload: JSON-serialisable request identity
+
+    Returns:
+        Hex sha256 digest
+    """
+    canonical = json.dumps({"kind": kind, "payload": payload}, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+@dataclass
+class _Flight:
+    """
+    A call in progress and the number of callers waiting on it
+    """
+    task: asyncio.Task
+    waiters: int = 0
+
+class SingleFlight:
+    """
+    Runs at most one call per key at a time; duplicates await the same result.
+
+    Within a process, concurrent callers with the same key share one task,
+    run detached from whichever caller started it: a caller that disconnects
+    or runs out of time stops waiting without cancelling the call for the
+    others, and the call is cancelled only when its last waiter has left.
+    Across workers, the first caller takes a Redis lock in CacheService and
+    publishes its result to the cache; callers in other workers wait for the
+    lock to be released and read that result. If the holder fails without
+    publishing a result, a waiting worker runs the call itself. Results must
+    be JSON-serialisable to be shared across workers.
+    """
+
+    def __init__(self, cache: CacheService, lock_ttl: int = None, result_ttl: int = None, poll_interval: float = None):
+        self.cache = cache
+        self.lock_ttl = lock_ttl or int(os.getenv("SINGLE_FLIGHT_LOCK_TTL", "600"))
+        self.result_ttl = result_ttl or int(os.getenv("SINGLE_FLIGHT_RESULT_TTL", "60"))
+        self.poll_interval = poll_interval or float(os.getenv("SINGLE_FLIGHT_POLL_INTERVAL", "0.5"))
+        self._in_flight: Dict[str, _Flight] = {}
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]], deadline: float) -> Any:
+        """
+        Run fn once for all concurrent callers with the same key
+
+        The shared call runs under its own deadline rather than the first
+        caller's, so one caller's short X-Request-Timeout does not shorten the
+        provider and storage timeouts of everyone coalesced with it; each
+        caller's own deadline still bounds how long it waits.
+
+        Args:
+            key: Request digest (see request_digest)
+            fn: Coroutine function producing the result
+            deadline: Seconds the shared call may run for (e.g. the endpoint's default deadline)
+
+        Returns:
+            The result of fn, possibly produced for another caller
+        """
+        flight = self._in_flight.get(key)
+        if flight is not None:
+            self.coalesced += 1
+            logger.info("Coalesced duplicate request %s with in-flight call", key[:12])
+        else:
+            # The task copies the context as it is created, so it gets this deadline instead of the caller's
+            with deadline_scope(deadline):
+                flight = _Flight(asyncio.ensure_future(self._run_once_across_workers(key, fn)))
+            self._in_flight[key] = flight
+            flight.task.add_done_callback(lambda _: self._forget(key, flight))
+
+        flight.waiters += 1
+        try:
+            # Shield so a departing caller does not cancel the shared call
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                logger.info("Every caller of request %s has gone; cancelling it", key[:12])
+                flight.task.cancel()
+                self._forget(key, flight)
+
+    def _forget(self, key: str, flight: _Flight):
+        if self._in_flight.get(key) is flight:
+            del self._in_flight[key]
+
+    async def _run_once_across_workers(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run fn under the shared Redis lock, or wait for the worker holding it"""
+        if not self.cache.redis_client:
+            return await fn()
+
+        lock_name = f"single_flight:{key}"
+        result_key = self.cache._get_key("single_flight", key)
+        while True:
+            token = await self.cache.acquire_lock(lock_name, self.lock_ttl)
+            if token:
+                try:
+                    result = await fn()
+                    await self.cache.set(result_key, {"result": result}, self.result_ttl)
+                    return result
+                finally:
+                    await self.cache.release_lock(lock_name, token)
+
+            logger.info("Waiting for request %s in flight on another worker", key[:12])
+            started = time.time()
+            while await self.cache.lock_held(lock_name) and time.time() - started < self.lock_ttl:
+                await asyncio.sleep(self.poll_interval)
+
+            cached = await self.cache.get(result_key)
+            if cached is not None:
+                self.coalesced += 1
+                return cached["result"]
+            # The holder failed without a result; try to take the lock ourselves
+
+# Global single-flight instance
+_single_flight_instance = None
+
+async def get_single_flight() -> SingleFlight:
+    """Get global single-flight instance"""
+    global _single_flight_instance
+    if _single_flight_instance is None:
+        _single_flight_instance = SingleFlight(await get_cache())
+    return _single_flight_instance
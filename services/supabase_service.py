@@ -0,0 +1,202 @@
+"""
+Supabase Data Access for Search Wizard
+Owns the process-wide Supabase client and keep-alive HTTP sessions for storage
+"""
+
+import os
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Any, List, Optional
+from urllib.parse import urlparse, quote
+
+import httpx
+import requests
+from dotenv import load_dotenv
+
+from .executor import run_blocking
+from .deadline import current_timeout, run_with_deadline
+from .logger import get_logger
+
+load_dotenv()
+
+logger = get_logger(__name__)
+
+SUPABASE_PUBLIC_PREFIX = '/storage/v1/object/public/'
+
+class SupabaseConfigError(Exception):
+    """Supabase credentials are missing"""
+    pass
+
+def _field(item: Any, name: str, default: Any = '') -> Any:
+    """Read a field from a row regardless of the client version's row type"""
+    if hasattr(item, 'get'):
+        return item.get(name, default)
+    if hasattr(item, '__getitem__'):
+        try:
+            return item[name]
+        except (KeyError, TypeError):
+            return default
+    return getattr(item, name, default)
+
+def _response_data(response: Any) -> List[Any]:
+    """Extract row data from a query response regardless of the client version"""
+    # Modern Supabase client returns an object with a data property
+    data = getattr(response, 'data', None)
+    # If data is not directly accessible as an attribute, try as a dictionary
+    if data is None and hasattr(response, '__getitem__'):
+        try:
+            data = response['data']
+        except (KeyError, TypeError):
+            data = []
+    return data or []
+
+class SupabaseService:
+    """
+    Long-lived Supabase data access layer
+
+    One Supabase client serves every table query, and one keep-alive
+    async HTTP client serves every storage download, so connection and TLS
+    setup is paid once per process rather than per request. Table queries
+    use the synchronous Supabase client and run on the blocking pool.
+    Downloads and queries are cut short at the current request deadline.
+    """
+
+    def __init__(self):
+        self.url = os.environ.get('NEXT_PUBLIC_SUPABASE_URL')
+        self.key = os.environ.get('NEXT_PUBLIC_SUPABASE_SERVICE_ROLE_KEY')
+        self.timeout = float(os.getenv("STORAGE_DOWNLOAD_TIMEOUT", "30"))
+        self.max_connections = int(os.getenv("STORAGE_MAX_CONNECTIONS", "20"))
+        self.client = None
+        self.http = None
+        self.session = None
+        self.connected = False
+
+    async def connect(self) -> bool:
+        """Create the shared Supabase client and HTTP sessions"""
+        self.connected = True
+        self.http = httpx.AsyncClient(
+            timeout=self.timeout,
+            follow_redirects=True,
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections
+            )
+        )
+        if self.session is None:
+            self.session = requests.Session()
+
+        if not self.url or not self.key:
+            logger.error("❌ Supabase credentials not found in environment variables")
+            return False
+
+        try:
+            from supabase import create_client
+            # For service-role access to bypass RLS policies, we need to use service_key not anon key
+            self.client = create_client(self.url, self.key)
+            logger.info("✅ Supabase client initialized with URL: %s", self.url)
+            return True
+        except ImportError:
+            logger.error("❌ Supabase client not installed")
+            return False
+        except Exception as e:
+            logger.error("❌ Supabase client initialization failed: %s", e)
+            return False
+
+    async def close(self):
+        """Close the shared HTTP sessions"""
+        if self.http is not None:
+            await self.http.aclose()
+            self.http = None
+        if self.session is not None:
+            self.session.close()
+            self.session = None
+        self.connected = False
+
+    def _require_client(self):
+        if self.client is None:
+            raise SupabaseConfigError(
+                "Supabase credentials missing. Please set NEXT_PUBLIC_SUPABASE_URL and NEXT_PUBLIC_SUPABASE_SERVICE_ROLE_KEY in .env file"
+            )
+        return self.client
+
+    async def _execute(self, query) -> List[Any]:
+        """Execute a query builder on the blocking pool and return its rows"""
+        response = await run_with_deadline(run_blocking("supabase", query.execute))
+        return _response_data(response)
+
+    # Table queries
+    async def get_golden_examples(self, user_id: str, name: str, columns: str = "name, example_type, file_url") -> List[Dict[str, Any]]:
+        """Get golden examples for a user by exact name, projecting only the given columns"""
+        client = self._require_client()
+        query = client.table('golden_examples').select(columns).eq('user_id', user_id).eq('name', name)
+        rows = await self._execute(query)
+        fields = [column.strip() for column in columns.split(',')]
+        return [{field: _field(row, field) for field in fields} for row in rows]
+
+    async def list_golden_example_names(self, user_id: str) -> List[str]:
+        """List the names of all golden examples for a user"""
+        client = self._require_client()
+        rows = await self._execute(client.table('golden_examples').select('name').eq('user_id', user_id))
+        return [name for name in (_field(row, 'name') for row in rows) if name]
+
+    # Storage downloads
+    def prepare_storage_request(self, file_url: str):
+        """Encode Supabase public storage URLs and attach authentication headers"""
+        headers = {}
+        parsed_url = urlparse(file_url)
+
+        if 'supabase.co' in parsed_url.netloc and SUPABASE_PUBLIC_PREFIX in parsed_url.path:
+            if self.key:
+                headers['apikey'] = self.key
+
+            path_parts = parsed_url.path.split(SUPABASE_PUBLIC_PREFIX)
+            if len(path_parts) > 1:
+                encoded_path = SUPABASE_PUBLIC_PREFIX + quote(path_parts[1])
+                file_url = f"{parsed_url.scheme}://{parsed_url.netloc}{encoded_path}"
+
+        return file_url, headers
+
+    async def download(self, file_url: str, headers: Optional[Dict[str, str]] = None) -> httpx.Response:
+        """Download an object over the shared keep-alive client"""
+        if not self.connected:
+            await self.connect()
+        file_url, storage_headers = self.prepare_storage_request(file_url)
+        storage_headers.update(headers or {})
+        return await self.http.get(file_url, headers=storage_headers, timeout=current_timeout(self.timeout))
+
+    @asynccontextmanager
+    async def stream(self, file_url: str, headers: Optional[Dict[str, str]] = None) -> AsyncIterator[httpx.Response]:
+        """Open a download over the shared keep-alive client without reading its body"""
+        if not self.connected:
+            await self.connect()
+        file_url, storage_headers = self.prepare_storage_request(file_url)
+        storage_headers.update(headers or {})
+        async with self.http.stream("GET", file_url, headers=storage_headers, timeout=current_timeout(self.timeout)) as response:
+            yield response
+
+# Global data access instance
+_supabase_instance = None
+
+async def get_supabase() -> SupabaseService:
+    """Get global Supabase data access instance"""
+    global _supabase_instance
+    if _supabase_instance is None:
+        _supabase_instance = SupabaseService()
+    if not _supabase_instance.connected:
+        await _supabase_instance.connect()
+    return _supabase_instance
+
+async def close_supabase():
+    """Close the global Supabase data access instance"""
+    global _supabase_instance
+    if _supabase_instance is not None:
+        await _supabase_instance.close()
+        _supabase_instance = None
+
+def get_storage_session() -> requests.Session:
+    """Keep-alive session for synchronous storage downloads"""
+    global _supabase_instance
+    if _supabase_instance is None:
+        _supabase_instance = SupabaseService()
+    if _supabase_instance.session is None:
+        _supabase_instance.session = requests.Session()
+    return _supabase_instance.session
@@ -0,0 +1,106 @@
+"""
+Upload Spool for Search Wizard
+Streams uploaded and downloaded files to disk in chunks instead of holding them in memory
+"""
+
+import os
+import hashlib
+import tempfile
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator, Optional
+from dotenv import load_dotenv
+
+from .executor import run_blocking
+from .logger import get_logger
+
+load_dotenv()
+
+logger = get_logger(__name__)
+
+class UploadTooLarge(Exception):
+    """An upload exceeded the configured maximum size"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        super().__init__(f"File exceeds the maximum upload size of {max_bytes} bytes")
+
+@dataclass
+class SpooledFile:
+    """
+    A file spooled to disk, with the size and hash of its bytes
+    """
+    path: str
+    size: int
+    sha256: str
+
+class UploadSpool:
+    """
+    Writes byte streams to uniquely named spool files.
+
+    Chunks are hashed as they arrive and written on the blocking pool, so
+    memory use stays at one chunk per upload regardless of the file size.
+    A stream that exceeds ``max_bytes`` is abandoned and its file removed.
+    """
+
+    def __init__(self, directory: str = None, max_bytes: int = None, chunk_size: int = None):
+        self.directory = directory or os.getenv("UPLOAD_SPOOL_DIR") or tempfile.gettempdir()
+        self.max_bytes = max_bytes or int(os.getenv("UPLOAD_MAX_BYTES", str(100 * 1024 * 1024)))
+        self.chunk_size = chunk_size or int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+
+    @asynccontextmanager
+    async def spool(self, chunks: AsyncIterator[bytes], suffix: str = "", expected_size: Optional[int] = None) -> AsyncIterator[SpooledFile]:
+        """
+        Spool a byte stream to disk for the duration of the context
+
+        Args:
+            chunks: Async iterator of byte chunks
+            suffix: File extension for the spool file (parsers dispatch on it)
+            expected_size: Declared size (e.g. Content-Length), rejected up front if too large
+
+        Yields:
+            SpooledFile, removed when the context exits
+        """
+        if expected_size is not None and expected_size > self.max_bytes:
+            raise UploadTooLarge(self.max_bytes)
+
+        os.makedirs(self.directory, exist_ok=True)
+        fd, path = tempfile.mkstemp(prefix="sw_upload_", suffix=suffix, dir=self.directory)
+        try:
+            hasher = hashlib.sha256()
+            size = 0
+            with os.fdopen(fd, "wb") as f:
+                async for chunk in chunks:
+                    if not chunk:
+                        continue
+                    size += len(chunk)
+                    if size > self.max_bytes:
+                        raise UploadTooLarge(self.max_bytes)
+                    hasher.update(chunk)
+                    await run_blocking("upload-spool", f.write, chunk)
+            spooled = SpooledFile(path=path, size=size, sha256=hasher.hexdigest())
+            logger.info("Spooled %d bytes to %s (sha256:%s)", size, path, spooled.sha256[:12])
+            yield spooled
+        finally:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    async def upload_chunks(self, upload) -> AsyncIterator[bytes]:
+        """Read a FastAPI UploadFile in chunks"""
+        while True:
+            chunk = await upload.read(self.chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+# Global spool instance
+_spool_instance = None
+
+def get_upload_spool() -> UploadSpool:
+    """Get global upload spool instance"""
+    global _spool_instance
+    if _spool_instance is None:
+        _spool_instance = UploadSpool()
+    return _spool_instance
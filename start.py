@@ -6,4 +6,6 @@ if __name__ == "__main__":
     # Get port from environment variable or use 8000 as default
     port = int(os.environ.get("PORT", 8000))
     print(f"Starting server on port {port}")
-    uvicorn.run("api:app", host="0.0.0.0", port=port)
+    # Trust X-Forwarded-For from the hosting proxy so admission limits see real client addresses
+    uvicorn.run("api:app", host="0.0.0.0", port=port, proxy_headers=True,
+                forwarded_allow_ips=os.environ.get("FORWARDED_ALLOW_IPS", "127.0.0.1"))
@@ -4,15 +4,15 @@ Utility functions for the Search Wizard API.
 """
 
 import io
-import os
 import logging
+import os
 import requests
 import tempfile
 from urllib.parse import urlparse
 
-# Configure logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
-logger = logging.getLogger(__name__)
+from services.logger import get_logger
+
+logger = get_logger(__name__)
 
 def download_and_extract_pdf(file_url, headers=None, name="Unknown"):
     """
@@ -27,7 +27,7 @@ def download_and_extract_pdf(file_url, headers=None, name="Unknown"):
     Returns:
         str: Extracted text from the PDF, or error message if extraction fails
     """
-    logger.info(f"Downloading and extracting PDF from URL: {file_url}")
+    logger.info("Downloading and extracting PDF from URL: %s", file_url)
     
     # Initialize headers if none provided
     if headers is None:
@@ -42,8 +42,9 @@ def download_and_extract_pdf(file_url, headers=None, name="Unknown"):
             logger.info("Added Supabase authentication to request")
     
     try:
-        # Download the PDF file
-        response = requests.get(file_url, headers=headers, timeout=30)
+        # Download the PDF file over the shared keep-alive session
+        from services.supabase_service import get_storage_session
+        response = get_storage_session().get(file_url, headers=headers, timeout=30)
         
         if response.status_code != 200:
             error_msg = f"Failed to download PDF: HTTP {response.status_code}"
@@ -53,11 +54,11 @@ def download_and_extract_pdf(file_url, headers=None, name="Unknown"):
         # Check if the response content is actually a PDF
         content_type = response.headers.get('Content-Type', '').lower()
         if not ('pdf' in content_type or file_url.lower().endswith('.pdf')):
-            logger.warning(f"URL may not be a PDF. Content-Type: {content_type}")
+            logger.warning("URL may not be a PDF. Content-Type: %s", content_type)
         
         # Extract text using our extract_text_from_pdf function
         extracted_text = extract_text_from_pdf(response.content)
-        logger.info(f"PDF extraction complete: {len(extracted_text)} chars")
+        logger.info("PDF extraction complete: %s chars", len(extracted_text))
         
         # Verify the quality of extracted text
         if len(extracted_text) < 100 and not extracted_text.strip():
@@ -65,7 +66,7 @@ def download_and_extract_pdf(file_url, headers=None, name="Unknown"):
         
         # Check for common error markers
         if any(marker in extracted_text for marker in ['[PDF extraction error', '[Content does not appear', '[PDF document contains no']):
-            logger.warning(f"Extraction encountered issues: {extracted_text[:100]}...")
+            logger.warning("Extraction encountered issues: %s...", extracted_text[:100])
         
         return extracted_text
     
@@ -85,7 +86,7 @@ def download_and_extract_from_url(file_url, name="Unknown"):
     Returns:
         str: Extracted text or downloaded content
     """
-    logger.info(f"Downloading content from URL for {name}: {file_url}")
+    logger.info("Downloading content from URL for %s: %s", name, file_url)
     
     try:
         import requests
@@ -102,16 +103,17 @@ def download_and_extract_from_url(file_url, name="Unknown"):
                 logger.info("Using Supabase service role key for authentication")
                 # For Supabase sign URLs, we shouldn't need to modify them
         
-        # Download the file directly
-        response = requests.get(file_url, headers=headers, timeout=30)
+        # Download the file directly over the shared keep-alive session
+        from services.supabase_service import get_storage_session
+        response = get_storage_session().get(file_url, headers=headers, timeout=30)
         if response.status_code == 200:
             # Check content type
             content_type = response.headers.get('Content-Type', '').lower()
-            logger.info(f"Downloaded content ({len(response.content)} bytes) with type: {content_type}")
+            logger.info("Downloaded content (%s bytes) with type: %s", len(response.content), content_type)
             
             # Handle PDF content
             if 'pdf' in content_type or file_url.lower().endswith('.pdf'):
-                logger.info(f"Processing PDF file: {name}")
+                logger.info("Processing PDF file: %s", name)
                 # Save to a temporary file to ensure proper handling
                 with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as temp_file:
                     temp_file.write(response.content)
@@ -120,13 +122,13 @@ def download_and_extract_from_url(file_url, name="Unknown"):
                 try:
                     # Use PyPDF2 to extract text
                     import PyPDF2
-                    logger.info(f"Extracting from downloaded PDF using PyPDF2 {PyPDF2.__version__}")
+                    logger.info("Extracting from downloaded PDF using PyPDF2 %s", PyPDF2.__version__)
                     
                     with open(temp_file_path, 'rb') as f:
                         pdf_reader = PyPDF2.PdfReader(f)
                         extracted_text = ""
                         total_pages = len(pdf_reader.pages)
-                        logger.info(f"PDF has {total_pages} pages")
+                        logger.info("PDF has %s pages", total_pages)
                         
                         for page_num in range(total_pages):
                             page = pdf_reader.pages[page_num]
@@ -135,20 +137,20 @@ def download_and_extract_from_url(file_url, name="Unknown"):
                                 extracted_text += page_text + "\n\n"
                                 
                         if extracted_text.strip():
-                            logger.info(f"Successfully extracted {len(extracted_text)} chars of text from PDF")
+                            logger.info("Successfully extracted %s chars of text from PDF", len(extracted_text))
                             return extracted_text
                         else:
                             logger.warning("PDF text extraction yielded empty content")
                             return "[PDF document contained no extractable text]"  
                 except Exception as pdf_error:
-                    logger.error(f"Error extracting text from downloaded PDF: {str(pdf_error)}")
+                    logger.error("Error extracting text from downloaded PDF: %s", pdf_error)
                     return f"[PDF extraction error: {str(pdf_error)}]"  
                 finally:
                     # Clean up temporary file
                     try:
                         os.unlink(temp_file_path)
                     except Exception as e:
-                        logger.error(f"Error cleaning up temp file: {str(e)}")
+                        logger.error("Error cleaning up temp file: %s", e)
             
             # For text content, return as is
             elif 'text' in content_type:
@@ -167,11 +169,11 @@ def download_and_extract_from_url(file_url, name="Unknown"):
             else:
                 return f"[Binary content of type {content_type} - {len(response.content)} bytes]"
         else:
-            logger.error(f"Failed to download file: HTTP {response.status_code}")
+            logger.error("Failed to download file: HTTP %s", response.status_code)
             return f"[Error downloading file: HTTP {response.status_code}]"
     
     except Exception as e:
-        logger.error(f"Error downloading/processing URL: {type(e).__name__}: {str(e)}")
+        logger.error("Error downloading/processing URL: %s: %s", type(e).__name__, e)
         return f"[Error processing URL: {str(e)}]"
 
 def extract_text_from_pdf(pdf_content):
@@ -184,15 +186,15 @@ def extract_text_from_pdf(pdf_content):
     Returns:
         str: Extracted text from the PDF
     """
-    # First, save a small sample of the PDF content for debugging
-    sample = pdf_content[:100].hex()
-    logger.info(f"PDF content sample (first 100 bytes): {sample}")
-    logger.info(f"Total PDF content size: {len(pdf_content)} bytes")
+    logger.info("Extracting text from %d bytes of PDF content", len(pdf_content))
+    if logger.isEnabledFor(logging.DEBUG):
+        # A small sample of the PDF content for debugging
+        logger.debug("PDF content sample (first 100 bytes): %s", pdf_content[:100].hex())
     
     try:
         # Import PyPDF2 here to avoid import errors if not available
         import PyPDF2
-        print(f"Using PyPDF2 version: {PyPDF2.__version__}")
+        logger.debug("Using PyPDF2 version: %s", PyPDF2.__version__)
         
         # Create a file-like object from the content
         pdf_stream = io.BytesIO(pdf_content)
@@ -204,7 +206,7 @@ def extract_text_from_pdf(pdf_content):
             # Try to recover by looking for PDF signature anywhere in the first 1KB
             pdf_sig_pos = pdf_content[:1024].find(b'%PDF')
             if pdf_sig_pos >= 0:
-                logger.info(f"Found PDF signature at position {pdf_sig_pos}, attempting recovery")
+                logger.info("Found PDF signature at position %s, attempting recovery", pdf_sig_pos)
                 pdf_stream = io.BytesIO(pdf_content[pdf_sig_pos:])
             else:
                 return "[Content does not appear to be a valid PDF file]" 
@@ -215,7 +217,7 @@ def extract_text_from_pdf(pdf_content):
         # Extract text from all pages
         extracted_text = ""
         total_pages = len(pdf_reader.pages)
-        logger.info(f"Extracting text from PDF with {total_pages} pages")
+        logger.info("Extracting text from PDF with %s pages", total_pages)
         
         for page_num in range(total_pages):
             try:
@@ -223,9 +225,9 @@ def extract_text_from_pdf(pdf_content):
                 page_text = page.extract_text()
                 if page_text:
                     extracted_text += page_text + "\n\n"
-                logger.info(f"Extracted {len(page_text) if page_text else 0} chars from page {page_num+1}")
+                logger.debug("Extracted %d chars from page %d", len(page_text) if page_text else 0, page_num + 1)
             except Exception as page_error:
-                logger.error(f"Error extracting text from page {page_num+1}: {str(page_error)}")
+                logger.error("Error extracting text from page %s: %s", page_num+1, page_error)
                 extracted_text += f"[Error extracting page {page_num+1}]\n\n"
             
         if not extracted_text.strip():
@@ -241,14 +243,14 @@ def extract_text_from_pdf(pdf_content):
                         alternate_text += page.get_text("text") + "\n\n"
                     
                 if alternate_text.strip():
-                    logger.info(f"Alternative extraction method yielded {len(alternate_text)} chars")
+                    logger.info("Alternative extraction method yielded %s chars", len(alternate_text))
                     return alternate_text
             except Exception as alt_error:
-                logger.error(f"Alternative extraction method failed: {str(alt_error)}")
+                logger.error("Alternative extraction method failed: %s", alt_error)
             
             return "[PDF document contains no extractable text content or may be scanned/image-based]"  
         
-        logger.info(f"Successfully extracted {len(extracted_text)} chars of text from PDF")
+        logger.info("Successfully extracted %s chars of text from PDF", len(extracted_text))
         
         # Check for common PDF issues that might indicate extraction problems
         if "trailer" in extracted_text and "xref" in extracted_text and "startxref" in extracted_text:
@@ -258,7 +260,7 @@ def extract_text_from_pdf(pdf_content):
         return extracted_text
         
     except Exception as e:
-        logger.error(f"Error extracting text from PDF: {type(e).__name__}: {str(e)}")
+        logger.error("Error extracting text from PDF: %s: %s", type(e).__name__, e)
         return f"[PDF text extraction failed: {str(e)}]"
 
 
@@ -276,7 +278,7 @@ def scrape_url_content(url: str) -> str:
         from bs4 import BeautifulSoup
         import re
         
-        logger.info(f"Scraping content from URL: {url}")
+        logger.info("Scraping content from URL: %s", url)
         
         # Add user agent to avoid blocking
         headers = {
@@ -325,14 +327,14 @@ def scrape_url_content(url: str) -> str:
             title_text = title.get_text().strip()
             text = f"Title: {title_text}\n\n{text}"
         
-        logger.info(f"Successfully extracted {len(text)} characters from URL")
+        logger.info("Successfully extracted %s characters from URL", len(text))
         return text
         
     except requests.exceptions.RequestException as e:
-        logger.error(f"Error fetching URL {url}: {str(e)}")
+        logger.error("Error fetching URL %s: %s", url, e)
         return f"[Error fetching URL: {str(e)}]"
     except Exception as e:
-        logger.error(f"Error scraping content from {url}: {str(e)}")
+        logger.error("Error scraping content from %s: %s", url, e)
         return f"[Error extracting content: {str(e)}]"
 
 
@@ -350,7 +352,7 @@ def process_text_content(text: str, artifact_type: str = None) -> str:
     try:
         import re
         
-        logger.info(f"Processing text content of {len(text)} characters")
+        logger.info("Processing text content of %s characters", len(text))
         
         # Basic text cleaning
         processed_text = text.strip()
@@ -378,11 +380,11 @@ def process_text_content(text: str, artifact_type: str = None) -> str:
                 # For company info, try to extract key sections
                 processed_text = structure_company_text(processed_text)
         
-        logger.info(f"Text processing complete, output length: {len(processed_text)}")
+        logger.info("Text processing complete, output length: %s", len(processed_text))
         return processed_text
         
     except Exception as e:
-        logger.error(f"Error processing text content: {str(e)}")
+        logger.error("Error processing text content: %s", e)
         return text  # Return original text if processing fails
 
 